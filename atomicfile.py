@@ -0,0 +1,46 @@
+"""Replace a file atomically: write a temp file next to it, then rename.
+
+A failed or interrupted write never leaves a truncated file behind; the old
+one stays as it was.
+"""
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+# The umask can only be read by setting it, which would briefly apply to
+# files other threads create; read it once while the module is imported
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def file_mode(file_path):
+    # Mode of the existing file, or what a new file would get
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def atomic_write(file_path, binary=False, keep_mode=False, suffix=".tmp"):
+    # Yields the open temp file. mkstemp creates it 0600; keep_mode gives it
+    # the mode of the file being replaced, or the usual umask-based one.
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=suffix)
+    try:
+        if keep_mode:
+            os.chmod(tmp_path, file_mode(file_path))
+        if binary:
+            f = os.fdopen(fd, "wb")
+        else:
+            f = os.fdopen(fd, "w", encoding="utf-8", newline="")
+        with f:
+            yield f
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,699 @@
+"""Benchmark suite for the extraction pipeline and the GUI's model side.
+
+    python bench.py xlsm --rows 50000                # one stage
+    python bench.py --json before.json all --quick   # every stage, saved as JSON
+    python bench.py compare before.json after.json   # flag regressions between runs
+
+Inputs are synthetic (see fixtures.py), so everything runs offline. Parsing
+and export cases run in a fresh child process so peak RSS is not polluted by
+earlier cases. The Tk benchmark starts Xvfb when there is no display and
+Xvfb is installed, and is skipped otherwise.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import extractor
+import fixtures
+from schema import default_schema
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _child(queue, func, args, kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, _peak_rss_mb(), result))
+
+
+def measure(func, *args, **kwargs):
+    # Linux carries ru_maxrss over fork+exec, so a child spawned from a big
+    # parent would report the parent's peak; the forkserver starts small
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(method)
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(queue, func, args, kwargs))
+    proc.start()
+    elapsed, peak_mb, result = queue.get()
+    proc.join()
+    return elapsed, peak_mb, result
+
+
+# Rows collected for --json: {"bench", "case", metrics...}
+RESULTS = []
+_current_bench = None
+
+
+def record(case, **metrics):
+    RESULTS.append({"bench": _current_bench, "case": case, **metrics})
+
+
+def report(case, elapsed, peak_mb, result, note=""):
+    # case must stay stable between runs (compare matches on it); anything
+    # derived from the measurement goes into note
+    record(case, elapsed_s=round(elapsed, 6), peak_rss_mb=round(peak_mb, 1), result=str(result))
+    label = f"{case} {note}" if note else case
+    print(f"{label:<28} {elapsed:8.3f} s  {peak_mb:8.1f} MB peak RSS  {result}")
+
+
+def count_xlsm_events(file_path, read_only):
+    return sum(1 for _ in extractor.iter_xlsm_events(file_path, read_only=read_only))
+
+
+def bench_xlsm(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = fixtures.make_xlsm(os.path.join(tmp, "bench.xlsm"), rows=args.rows)
+        print(f"XLSM fixture: {args.rows} rows, {os.path.getsize(path) / 1024:.0f} KiB")
+        report("load_workbook (full)", *measure(count_xlsm_events, path, False))
+        report("read_only streaming", *measure(count_xlsm_events, path, True))
+
+
+def count_pdf_events(file_path, workers):
+    return len(extractor.parse_pdf(file_path, workers=workers))
+
+
+def bench_pdf(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = fixtures.make_pdf(os.path.join(tmp, "bench.pdf"), table_pages=args.pages)
+        print(f"PDF fixture: {args.pages} table pages, {os.path.getsize(path) / 1024:.0f} KiB")
+        base = None
+        for workers in dict.fromkeys(args.workers):  # 1,N collapses on one CPU
+            elapsed, peak_mb, result = measure(count_pdf_events, path, workers)
+            base = base or elapsed
+            report(f"{workers} worker(s)", elapsed, peak_mb, result, note=f"x{base / elapsed:.2f}")
+
+
+def count_pdf_events_prescan(file_path, prescan):
+    return len(extractor.parse_pdf(file_path, workers=1, prescan=prescan))
+
+
+def bench_prescan(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = fixtures.make_pdf(os.path.join(tmp, "mixed.pdf"), table_pages=args.table_pages,
+                                 text_pages=args.text_pages)
+        print(f"Mixed PDF fixture: {args.table_pages} table pages, {args.text_pages} text pages")
+        full = measure(count_pdf_events_prescan, path, False)
+        report("extract_tables on all pages", *full)
+        scanned = measure(count_pdf_events_prescan, path, True)
+        report("pre-scan first", *scanned)
+        print(f"saved {100 * (1 - scanned[0] / full[0]):.0f}% wall time")
+
+
+def _synthetic_rows(n):
+    types = sorted(default_schema().names)
+    return [(f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", types[i % 3], f"P{i % 5000}", "") for i in range(n)]
+
+
+def _legacy_refresh(tree, rows):
+    # What refresh_tree did before virtualization: rebuild every item
+    for i in tree.get_children():
+        tree.delete(i)
+    for idx, values in enumerate(rows):
+        tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+        tree.insert("", "end", iid=idx, values=values, tags=(tag,))
+
+
+def start_virtual_display():
+    # -> Xvfb process or None. Only used when there is no display at all.
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin") or not shutil.which("Xvfb"):
+        return None
+    display = ":%d" % (90 + os.getpid() % 100)
+    proc = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(0.5)
+    return proc
+
+
+def bench_tree(args):
+    import tkinter as tk
+    from tkinter import ttk
+    from virtual_tree import VirtualTreeview
+    xvfb = start_virtual_display()
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        if xvfb:
+            xvfb.terminate()
+        print(f"Tree benchmark skipped: no display and no Xvfb ({e})")
+        record("skipped", reason="no display")
+        return
+    root.geometry("700x500")
+    columns = ("date", "event_type", "project_code", "notes")
+    for n in args.sizes:
+        rows = _synthetic_rows(n)
+        legacy = ttk.Treeview(root, columns=columns, show="headings")
+        legacy.pack()
+        _legacy_refresh(legacy, rows)
+        start = time.perf_counter()
+        _legacy_refresh(legacy, rows)
+        root.update_idletasks()
+        legacy_s = time.perf_counter() - start
+        legacy.destroy()
+
+        table = VirtualTreeview(root, columns, rows.__getitem__)
+        table.frame.pack(expand=True, fill=tk.BOTH)
+        root.update()
+        keys = list(range(n))
+        start = time.perf_counter()
+        table.set_rows(keys)
+        root.update_idletasks()
+        virtual_s = time.perf_counter() - start
+        start = time.perf_counter()
+        table.update_row(keys[0])
+        root.update_idletasks()
+        row_s = time.perf_counter() - start
+        table.frame.destroy()
+        record(f"{n} events", rebuild_ms=round(legacy_s * 1000, 3), virtual_refresh_ms=round(virtual_s * 1000, 3),
+               row_update_ms=round(row_s * 1000, 3))
+        print(f"{n:>7} events  full rebuild {legacy_s * 1000:9.1f} ms  "
+              f"virtual refresh {virtual_s * 1000:7.2f} ms  single-row update {row_s * 1000:6.2f} ms")
+    root.destroy()
+    if xvfb:
+        xvfb.terminate()
+
+
+def bench_search(args):
+    from search import SearchIndex
+    queries = ["4", "47", "4711", "type:ccr code:4711", "date:2024-01..2024-03", "zu itv", "nothing"]
+    for n in args.sizes:
+        events = [dict(zip(("date", "event_type", "project_code", "notes"), row)) for row in _synthetic_rows(n)]
+        start = time.perf_counter()
+        index = SearchIndex(enumerate(events))
+        build_ms = (time.perf_counter() - start) * 1000
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.filter(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        record(f"{n} events", build_ms=round(build_ms, 3), filter_max_ms=round(max(timings), 3),
+               filter_mean_ms=round(sum(timings) / len(timings), 3))
+        print(f"{n:>7} events  index build {build_ms:7.1f} ms  "
+              f"filter max {max(timings):6.2f} ms  mean {sum(timings) / len(timings):6.2f} ms")
+
+
+def _legacy_sort(store, rows, column, reverse=False):
+    # sort_by_column before typed sorting: every column compared as the text
+    # the Treeview showed
+    rows.sort(key=lambda event_id: str(store[event_id][column]), reverse=reverse)
+    return rows
+
+
+def bench_refresh(args):
+    # The model side of refresh_tree / sort_by_column: filter, then sort the
+    # row keys. Typed sorts run twice: cold (ranks built) and warm.
+    from event_store import EventStore
+    from search import SearchIndex
+    from sorting import SortIndex
+    cases = (
+        ("filter_only", "", []),
+        ("sort_date", "", [("date", False)]),
+        ("sort_code", "", [("project_code", False)]),
+        ("sort_code_desc", "", [("project_code", True)]),
+        ("sort_type_then_date", "", [("event_type", False), ("date", True)]),
+        ("filtered_sort_code", "type:ccr", [("project_code", False)]),
+    )
+    for n in args.sizes:
+        store = EventStore(_parsed_events(n))
+        index = SearchIndex(store.items())
+        sorter = SortIndex(store)
+        timings = {}
+        rows = index.filter("")
+        start = time.perf_counter()
+        _legacy_sort(store, rows, "project_code")
+        timings["legacy_text_sort_code_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        for name, query, spec in cases:
+            for run in ("cold", "warm"):
+                index.filter("")  # forget the previous query so nothing is narrowed
+                start = time.perf_counter()
+                sorter.sort(index.filter(query), spec)
+                timings[f"{name}_{run}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            sorter.invalidate()
+        record(f"{n} events", **timings)
+        print(f"{n:>7} events")
+        for metric, value in timings.items():
+            print(f"    {metric[:-3]:<28} {value:8.2f} ms")
+
+
+def _parsed_events(n):
+    # Mimics what the parsers produce: one date string per row, fresh
+    # project-code strings per event
+    types = sorted(default_schema().names)
+    for i in range(n):
+        date_str = f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        yield extractor.make_event(date_str, types[i % 3], f" P{i % 5000} ".strip())
+
+
+def bench_memory(args):
+    import tracemalloc
+    from event_store import EventStore
+    for n in args.sizes:
+        tracemalloc.start()
+        events = list(_parsed_events(n))
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        del events
+        tracemalloc.stop()
+        tracemalloc.start()
+        store = EventStore(_parsed_events(n))
+        store_bytes = tracemalloc.get_traced_memory()[0]
+        del store
+        tracemalloc.stop()
+        record(f"{n} events", dicts_bytes_per_event=round(dict_bytes / n), store_bytes_per_event=round(store_bytes / n))
+        print(f"{n:>7} events  list of dicts {dict_bytes / n:6.0f} B/event  "
+              f"EventStore {store_bytes / n:6.0f} B/event")
+
+
+def bench_bulk_delete(args):
+    # Timing for batched deletes under an active filter; the results are
+    # checked by tests/test_bulk_delete.py (and the GUI path by
+    # tests/test_gui_table.py)
+    from event_store import EventStore
+    from search import SearchIndex
+    store = EventStore(_parsed_events(args.events))
+    index = SearchIndex(store.items())
+    visible = index.filter(args.query)
+    selection = visible[1::2][:args.delete] if len(visible) > 2 * args.delete else visible[:args.delete]
+    start = time.perf_counter()
+    store.remove_many(selection)
+    index.remove_many(selection)
+    elapsed = time.perf_counter() - start
+    after = index.filter(args.query)
+    record(f"{args.events} events", delete_ms=round(elapsed * 1000, 3), deleted=len(selection))
+    print(f"deleted {len(selection)} of {args.events} events under filter {args.query!r} "
+          f"in {elapsed * 1000:.1f} ms; {len(after)} still match")
+
+
+def _legacy_export_ics(events, file_path):
+    # export_ics before streaming: one Calendar holding every Event, written
+    # as a single to_ical() blob
+    from datetime import datetime
+    from icalendar import Calendar, Event
+    cal = Calendar()
+    cal.add('prodid', '-//iCal Event Extractor//mxm.dk//')
+    cal.add('version', '2.0')
+    for event in events:
+        try:
+            event_date = datetime.strptime(event['date'], "%Y-%m-%d").date()
+        except Exception:
+            continue
+        ical_event = Event()
+        ical_event.add('summary', f"{event['event_type']}: {event['project_code']}")
+        ical_event.add('dtstart', event_date)
+        ical_event.add('dtend', event_date)
+        ical_event.add('description', event['notes'])
+        ical_event.add('transp', 'TRANSPARENT')
+        ical_event.add('X-MICROSOFT-CDO-ALLDAYEVENT', 'TRUE')
+        cal.add_component(ical_event)
+    with open(file_path, 'wb') as f:
+        f.write(cal.to_ical())
+    return len(cal.subcomponents)
+
+
+def export_from_store(n, file_path, streaming):
+    from event_store import EventStore
+    store = EventStore(_parsed_events(n))
+    if streaming:
+        return extractor.export_ics(store, file_path)
+    return _legacy_export_ics(store, file_path)
+
+
+def bench_export(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, streaming in (("icalendar Calendar", False), ("streaming writer", True)):
+            path = os.path.join(tmp, f"{streaming}.ics")
+            elapsed, peak_mb, written = measure(export_from_store, args.events, path, streaming)
+            report(label, elapsed, peak_mb, written, note=f"{written / elapsed:,.0f} ev/s")
+
+
+def per_file_imports(paths):
+    # The old workflow: one import per file, results concatenated by hand
+    events = []
+    for path in paths:
+        events.extend(extractor.parse_file(path, all_sheets=True))
+    return len(events)
+
+
+def merged_import(paths, workers):
+    from merge import EventMerger, merge_files
+    merger = EventMerger()
+    events = merge_files(paths, merger, workers=workers)
+    return f"{len(events)} events, {merger.summary()}"
+
+
+def bench_merge(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [fixtures.make_xlsm(os.path.join(tmp, f"plan{i:04d}.xlsm"), rows=args.rows, sheets=args.sheets,
+                                    offset_days=i * args.rows // 2)
+                 for i in range(args.files)]
+        print(f"{args.files} XLSM fixtures, {args.sheets} sheets x {args.rows} rows, half overlapping")
+        report(f"{args.files} per-file imports", *measure(per_file_imports, paths))
+        for workers in dict.fromkeys(args.workers):  # 1,N collapses on one CPU
+            report(f"merge, {workers} worker(s)", *measure(merged_import, paths, workers))
+
+
+def update_after_edit(plans, out_path, cache_dir, watch_mode):
+    # Brings the combined calendar up to date, rewrites one plan, then times
+    # the update: a watch round, or a full --combine --incremental rerun
+    # (parse cache warm, so only the edited file is actually parsed)
+    from cache import ParseCache
+    from merge import merge_files
+    import watch
+    cache = ParseCache(cache_dir)
+    paths = sorted(os.path.join(plans, name) for name in os.listdir(plans))
+    if watch_mode:
+        watcher = watch.FolderWatcher([plans], watch.CombinedCalendar(out_path), workers=1, cache=cache, settle=0)
+        watcher.process(*watcher.poll())
+    else:
+        extractor.sync_ics(merge_files(paths, workers=1, cache=cache), out_path)
+    edited = paths[len(paths) // 2]
+    fixtures.make_xlsm(edited, rows=200, sheets=2, offset_days=7)
+    start = time.perf_counter()
+    if watch_mode:
+        stats, _failures = watcher.process(*watcher.poll())
+    else:
+        stats = extractor.sync_ics(merge_files(paths, workers=1, cache=cache), out_path)
+    return time.perf_counter() - start, str(stats)
+
+
+def bench_watch(args):
+    import shutil
+    with tempfile.TemporaryDirectory() as tmp:
+        pristine = os.path.join(tmp, "plans")
+        os.mkdir(pristine)
+        for i in range(args.files):
+            fixtures.make_xlsm(os.path.join(pristine, f"plan{i:04d}.xlsm"), rows=200, sheets=2,
+                               offset_days=i * 100)
+        print(f"{args.files} XLSM fixtures, one rewritten between two updates")
+        for label, watch_mode in (("rerun --combine", False), ("watch round", True)):
+            plans = os.path.join(tmp, label.split()[0])
+            shutil.copytree(pristine, plans)
+            _elapsed, peak_mb, (round_s, stats) = measure(
+                update_after_edit, plans, plans + ".ics", plans + ".cache", watch_mode)
+            report(label, round_s, peak_mb, stats)
+
+
+def resync_after_edits(n, changed, file_path, delta_path):
+    # Second sync of the same calendar after `changed` notes were edited
+    events = [dict(event) for event in _parsed_events(n)]
+    extractor.sync_ics(events, file_path)
+    for event in events[::max(1, n // changed)][:changed]:
+        event["notes"] = "edited"
+    start = time.perf_counter()
+    stats = extractor.sync_ics(events, file_path, delta_path=delta_path)
+    elapsed = time.perf_counter() - start
+    return f"{stats}; resync {elapsed:.3f} s"
+
+
+def import_ics(file_path, streaming):
+    if streaming:
+        return sum(1 for _ in extractor.iter_ics_events(file_path))
+    from icalendar import Calendar
+    with open(file_path, "rb") as f:
+        cal = Calendar.from_ical(f.read())
+    return len(cal.walk("VEVENT"))
+
+
+def bench_ics_import(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cal.ics")
+        events = list(_parsed_events(args.events))
+        extractor.export_ics(events, path)
+        assert extractor.parse_ics(path) == events, "round trip changed events"
+        print(f"{args.events} events, {os.path.getsize(path) / 1024 / 1024:.1f} MiB, round trip checked")
+        for label, streaming in (("Calendar.from_ical", False), ("streaming reader", True)):
+            elapsed, peak_mb, count = measure(import_ics, path, streaming)
+            report(label, elapsed, peak_mb, count, note=f"{count / elapsed:,.0f} ev/s")
+
+
+def bench_sync(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path, delta_path = os.path.join(tmp, "cal.ics"), os.path.join(tmp, "cal.delta.ics")
+        report(f"sync {args.events} events", *measure(resync_after_edits, args.events, args.changed,
+                                                      path, delta_path))
+        record("file sizes", full_bytes=os.path.getsize(path), delta_bytes=os.path.getsize(delta_path))
+        print(f"full calendar {os.path.getsize(path) / 1024:.0f} KiB, "
+              f"delta {os.path.getsize(delta_path) / 1024:.0f} KiB")
+
+
+# Start-up as it was before the parsers and ttkthemes were imported lazily
+_EAGER_IMPORTS = "import openpyxl, pdfplumber; from ttkthemes import ThemedStyle; "
+_HEAVY_MODULES = ("openpyxl", "pdfplumber", "ttkthemes", "PIL")
+_WINDOW_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+{eager}import main
+app = main.EventExtractorApp()
+{theme}app.update()
+print(time.perf_counter() - start)
+app.destroy()
+"""
+
+
+def _import_profile(code):
+    # Runs code in a fresh interpreter under -X importtime; -> (total import
+    # time in ms, {module: self ms}), where total adds up the top-level imports
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    total_us = 0
+    self_ms = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        self_ms[name.strip()] = int(own) / 1000
+        if not name.startswith("  "):  # one space after the bar, more when nested
+            total_us += int(cumulative)
+    return total_us / 1000, self_ms
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def bench_startup(args):
+    # Import cost of main.py in a fresh interpreter, as now and with the
+    # parsers and ttkthemes loaded up front as before; then the time until
+    # the window has been drawn, where a display is available
+    cases = (
+        ("import main", "import main"),
+        ("import main, eager", _EAGER_IMPORTS + "import main"),
+    )
+    for case, code in cases:
+        runs = [_import_profile(code) for _ in range(args.runs)]
+        total_ms = _median([total for total, _ in runs])
+        self_ms = runs[-1][1]
+        top = sorted(self_ms.items(), key=lambda kv: -kv[1])[:args.top]
+        record(case, import_ms=round(total_ms, 3), modules=len(self_ms))
+        print(f"{case:<28} {total_ms:8.1f} ms  {len(self_ms)} modules")
+        for name, ms in top:
+            print(f"    {name.strip():<36} {ms:7.1f} ms self")
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import sys, main; print(' '.join(m for m in {_HEAVY_MODULES!r} if m in sys.modules))"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.split()
+    print(f"loaded by import main: {', '.join(loaded) or 'none of ' + ', '.join(_HEAVY_MODULES)}")
+    xvfb = start_virtual_display()
+    try:
+        for case, eager, theme in (("window shown", "", ""),
+                                   ("window shown, eager", _EAGER_IMPORTS, "ThemedStyle(app).set_theme('adapta')\n")):
+            script = _WINDOW_SCRIPT.format(eager=eager, theme=theme)
+            times = []
+            for _ in range(args.runs):
+                out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                     cwd=os.path.dirname(os.path.abspath(__file__)))
+                if out.returncode:
+                    print(f"Window benchmark skipped: {out.stderr.strip().splitlines()[-1]}")
+                    record("window skipped", reason="no display")
+                    return
+                times.append(float(out.stdout.strip().splitlines()[-1]))
+            elapsed = _median(times)
+            record(case, window_ms=round(elapsed * 1000, 3))
+            print(f"{case:<28} {elapsed * 1000:8.1f} ms to first drawn window")
+    finally:
+        if xvfb:
+            xvfb.terminate()
+
+
+# Smaller sizes for `all --quick`: every stage still runs, in about a minute
+QUICK = {
+    "xlsm": ["--rows", "5000"],
+    "pdf": ["--pages", "8"],
+    "prescan": ["--table-pages", "4", "--text-pages", "8"],
+    "tree": ["--sizes", "1000,10000"],
+    "search": ["--sizes", "10000"],
+    "refresh": ["--sizes", "10000"],
+    "memory": ["--sizes", "10000"],
+    "bulk-delete": ["--events", "20000", "--delete", "5000"],
+    "merge": ["--files", "40"],
+    "export": ["--events", "10000"],
+    "ics-import": ["--events", "10000"],
+    "sync": ["--events", "10000", "--changed", "100"],
+    "watch": ["--files", "40"],
+    "startup": ["--runs", "3"],
+}
+
+
+def run_all(args):
+    global _current_bench
+    for name in QUICK:
+        print(f"== {name}")
+        sub_args = args.parser.parse_args([name] + (QUICK[name] if args.quick else []))
+        _current_bench = name
+        sub_args.func(sub_args)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def save_results(file_path, argv):
+    data = {
+        "meta": {
+            "commit": _git_commit(),
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "argv": argv,
+        },
+        "results": RESULTS,
+    }
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    print(f"results saved to {file_path}")
+
+
+def compare(args):
+    # Lower is better for every metric recorded (times, memory, bytes)
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"old: {old['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    old_rows = {(r["bench"], r["case"]): r for r in old["results"]}
+    regressions = 0
+    for row in new["results"]:
+        before = old_rows.get((row["bench"], row["case"]))
+        if before is None:
+            continue
+        for metric, value in row.items():
+            base = before.get(metric)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(base, (int, float)):
+                continue
+            if base <= 0:
+                continue
+            # Sub-millisecond timings are mostly scheduler noise
+            if (metric.endswith("_ms") and base < 1) or (metric.endswith("_s") and base < 0.001):
+                continue
+            ratio = value / base
+            flag = ""
+            if ratio > 1 + args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif ratio < 1 - args.threshold:
+                flag = "  faster/smaller"
+            print(f"{row['bench']:<12} {row['case']:<24} {metric:<24} {base:>12g} -> {value:<12g} x{ratio:5.2f}{flag}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    global _current_bench
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", metavar="FILE", help="also save the results as JSON")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    p = sub.add_parser("xlsm", help="full load_workbook vs read-only streaming")
+    p.add_argument("--rows", type=int, default=50000)
+    p.set_defaults(func=bench_xlsm)
+    p = sub.add_parser("pdf", help="PDF table extraction with 1 vs N worker processes")
+    p.add_argument("--pages", type=int, default=40)
+    p.add_argument("--workers", type=lambda s: [int(w) for w in s.split(",")],
+                   default=[1, os.cpu_count() or 1], help="comma-separated worker counts")
+    p.set_defaults(func=bench_pdf)
+    p = sub.add_parser("prescan", help="page pre-filter on a PDF with cover/legend pages")
+    p.add_argument("--table-pages", type=int, default=10)
+    p.add_argument("--text-pages", type=int, default=30)
+    p.set_defaults(func=bench_prescan)
+    p = sub.add_parser("tree", help="Treeview refresh latency, full rebuild vs virtualized")
+    p.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[1000, 10000, 100000])
+    p.set_defaults(func=bench_tree)
+    p = sub.add_parser("search", help="indexed search filter latency")
+    p.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[1000, 10000, 100000])
+    p.set_defaults(func=bench_search)
+    p = sub.add_parser("refresh", help="table refresh model side: filter and column sorts")
+    p.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[10000, 100000])
+    p.set_defaults(func=bench_refresh)
+    p = sub.add_parser("memory", help="memory per event, list of dicts vs EventStore")
+    p.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[10000, 100000])
+    p.set_defaults(func=bench_memory)
+    p = sub.add_parser("bulk-delete", help="batched delete under an active search filter")
+    p.add_argument("--events", type=int, default=150000)
+    p.add_argument("--delete", type=int, default=50000)
+    p.add_argument("--query", default="type:ccr")
+    p.set_defaults(func=bench_bulk_delete)
+    p = sub.add_parser("merge", help="merged multi-file import vs one import per file")
+    p.add_argument("--files", type=int, default=500)
+    p.add_argument("--rows", type=int, default=100)
+    p.add_argument("--sheets", type=int, default=2)
+    p.add_argument("--workers", type=lambda s: [int(w) for w in s.split(",")],
+                   default=[1, os.cpu_count() or 1], help="comma-separated worker counts")
+    p.set_defaults(func=bench_merge)
+    p = sub.add_parser("export", help="ICS export throughput and peak memory")
+    p.add_argument("--events", type=int, default=100000)
+    p.set_defaults(func=bench_export)
+    p = sub.add_parser("ics-import", help="ICS import throughput, icalendar vs streaming reader")
+    p.add_argument("--events", type=int, default=100000)
+    p.set_defaults(func=bench_ics_import)
+    p = sub.add_parser("sync", help="incremental re-export after a few edits, full vs delta size")
+    p.add_argument("--events", type=int, default=100000)
+    p.add_argument("--changed", type=int, default=500)
+    p.set_defaults(func=bench_sync)
+    p = sub.add_parser("watch", help="one changed file: watch round vs full --combine --incremental rerun")
+    p.add_argument("--files", type=int, default=300)
+    p.set_defaults(func=bench_watch)
+    p = sub.add_parser("startup", help="GUI start-up: -X importtime of main.py and time to first window")
+    p.add_argument("--runs", type=int, default=7, help="fresh interpreters per case (median is reported)")
+    p.add_argument("--top", type=int, default=5, help="slowest modules listed per case")
+    p.set_defaults(func=bench_startup)
+    p = sub.add_parser("all", help="run every benchmark (use --json to keep the results)")
+    p.add_argument("--quick", action="store_true", help="small sizes, for a quick regression check")
+    p.set_defaults(func=run_all)
+    p = sub.add_parser("compare", help="compare two --json result files")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="relative change reported as regression")
+    p.set_defaults(func=compare)
+    args = parser.parse_args(argv)
+    if args.bench == "compare":
+        return compare(args)
+    args.parser = parser
+    _current_bench = args.bench
+    args.func(args)
+    if args.json:
+        save_results(args.json, sys.argv[1:] if argv is None else list(argv))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
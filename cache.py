@@ -0,0 +1,196 @@
+"""On-disk parse cache keyed by file content.
+
+Entries are gzip'd JSON files named after a SHA-256 key built from the file
+content hash, the parser version and the header/date configuration. File
+hashes are remembered per path together with size and mtime, so an unchanged
+file is not even re-read; that index is written once per parse (save_index)
+and forgets files that no longer exist. Entries are evicted
+least-recently-used (by file mtime, touched on every hit) once the cache
+grows past its size or entry limits.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from atomicfile import atomic_write
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 20000
+INDEX_NAME = "files.json"
+ENTRY_SUFFIX = ".json.gz"
+HASH_BLOCK = 1024 * 1024
+
+
+def default_cache_dir():
+    override = os.environ.get("ICAL_EXTRACTOR_CACHE")
+    if override:
+        return override
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ical_event_extractor")
+
+
+def pack_events(events):
+    # Event types repeat on every row: store them once in a table
+    types = {}
+    rows = []
+    for event in events:
+        type_idx = types.setdefault(event["event_type"], len(types))
+        rows.append([event["date"], type_idx, event["project_code"], event["notes"]])
+    return {"types": list(types), "rows": rows}
+
+
+def unpack_events(packed):
+    types = packed["types"]
+    return [
+        {"date": d, "event_type": types[t], "project_code": code, "notes": notes}
+        for d, t, code, notes in packed["rows"]
+    ]
+
+
+def _atomic_write(path, data):
+    with atomic_write(path, binary=True) as f:
+        f.write(data)
+
+
+class ParseCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._usage = None  # (bytes, entries), scanned on the first put
+        os.makedirs(self.directory, exist_ok=True)
+        self._index_path = os.path.join(self.directory, INDEX_NAME)
+        self._index = self._load_index()
+        self._new_digests = {}  # index entries not saved yet
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        _atomic_write(self._index_path, json.dumps(self._index).encode("utf-8"))
+
+    def save_index(self):
+        # Writes the digests hashed since the last save. Entries another
+        # process saved meanwhile are kept; paths that are gone are dropped.
+        if not self._new_digests:
+            return
+        index = self._load_index()
+        index.update(self._new_digests)
+        self._index = {path: entry for path, entry in index.items() if os.path.exists(path)}
+        self._new_digests = {}
+        self._save_index()
+
+    def take_new_digests(self):
+        # For pool workers: their copy of the cache never saves the index,
+        # the parent adds these back (add_digests) and saves once
+        digests = self._new_digests
+        self._new_digests = {}
+        return digests
+
+    def add_digests(self, digests):
+        self._index.update(digests)
+        self._new_digests.update(digests)
+
+    def file_digest(self, file_path):
+        # Size + mtime fast path; the content is only hashed when either changed
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+        known = self._index.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        self._index[path] = self._new_digests[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError, EOFError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        data = gzip.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), compresslevel=5)
+        _atomic_write(self._entry_path(key), data)
+        # Usage is tracked incrementally so a PDF storing one entry per page
+        # does not rescan the directory every time
+        if self._usage is None:
+            self.evict()
+            return
+        size, count = self._usage
+        self._usage = (size + len(data), count + 1)
+        if size + len(data) > self.max_bytes or count + 1 > self.max_entries:
+            self.evict()
+
+    def entries(self):
+        # [(mtime, size, path)] oldest first
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, st.st_size, entry.path))
+        found.sort()
+        return found
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _mtime, size, _path in entries)
+        removed = 0
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _mtime, size, path = entries.pop(0)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        self._usage = (total, len(entries))
+        return removed
+
+    def clear(self):
+        for _mtime, _size, path in self.entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._index = {}
+        self._new_digests = {}
+        self._save_index()
+        self._usage = (0, 0)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats_text(self):
+        return f"cache: {self.hits} hit{'s' if self.hits != 1 else ''}, {self.misses} miss{'es' if self.misses != 1 else ''}"
@@ -0,0 +1,220 @@
+"""Headless batch converter: python -m cli INPUT [INPUT ...] -o OUTDIR"""
+import argparse
+import os
+import sys
+import time
+
+import extractor
+import instrument
+from cache import ParseCache
+from extractor import collect_inputs
+from instrument import log
+from merge import EventMerger, merge_files
+from schema import SchemaError, load_schema
+
+
+def output_path(file_path, inputs, output_dir):
+    # OUTDIR/<path relative to the input directory it was found in>.ics, so
+    # files from subdirectories (-r) keep their folders
+    for root in inputs:
+        if os.path.isdir(root):
+            rel = os.path.relpath(file_path, root)
+            if not rel.startswith(os.pardir + os.sep):
+                break
+    else:
+        rel = os.path.basename(file_path)
+    return os.path.join(output_dir, os.path.splitext(rel)[0] + ".ics")
+
+
+def output_collisions(out_paths):
+    # -> {output path: [input files]} for outputs more than one input maps to
+    # (plan.xlsm next to plan.pdf, the same name in two input directories).
+    # Compared case-insensitively, as on Windows and macOS.
+    seen = {}
+    for file_path, out_path in out_paths.items():
+        seen.setdefault(os.path.normcase(out_path).casefold(), []).append((out_path, file_path))
+    return {entries[0][0]: [file_path for _out, file_path in entries]
+            for entries in seen.values() if len(entries) > 1}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="ical-event-extractor",
+        description="Convert XLSM/PDF project schedules to iCal (.ics) files.",
+    )
+    parser.add_argument("inputs", nargs="+", help="XLSM/PDF files or directories containing them")
+    parser.add_argument("-o", "--output-dir", default=".",
+                        help="directory for one .ics per input file (default: current directory)")
+    parser.add_argument("-c", "--combine", metavar="FILE",
+                        help="merge all files (every sheet, every table) into a single .ics file instead, "
+                             "dropping duplicate events")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="processes for PDF table extraction, or for whole files with --combine "
+                             "(default: based on page/file count)")
+    parser.add_argument("--all-sheets", action="store_true",
+                        help="read every worksheet of an XLSM, not only the active one (always on with --combine)")
+    parser.add_argument("--pages", metavar="RANGES",
+                        help="only scan these PDF pages, e.g. 1-3,7,10-")
+    parser.add_argument("--no-prescan", dest="prescan", action="store_false",
+                        help="run table detection on every PDF page, not only pages with headers or dates")
+    parser.add_argument("--schema", metavar="FILE",
+                        help="JSON/TOML file describing the event columns and their header spellings "
+                             "(default: $ICAL_EXTRACTOR_SCHEMA or the built-in columns)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="diff against the previous export: keep UIDs, bump SEQUENCE on changed events "
+                             "and also write only the changes to NAME.delta.ics")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and update the --combine file whenever input files are added, "
+                             "changed or removed; only changed files are parsed again")
+    parser.add_argument("--interval", type=float, default=10.0, metavar="SECONDS",
+                        help="how often --watch polls the inputs; files must be unchanged this long "
+                             "before they are read (default: 10)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="parse cache location (default: $ICAL_EXTRACTOR_CACHE or ~/.cache/ical_event_extractor)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="always re-parse input files instead of reusing cached results")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record per-stage timings and counters and save them to FILE "
+                             "(pages extracted in worker processes are not traced one by one; use -j 1)")
+    parser.add_argument("--trace-format", choices=("chrome", "json"), default="chrome",
+                        help="chrome: trace for chrome://tracing or Perfetto (default); "
+                             "json: per-stage totals, counters and every span")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="also run cProfile and tracemalloc and write their reports and the stage trace to DIR")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="log progress (-vv for debug output; default: $ICAL_EXTRACTOR_LOG or warnings only)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report errors")
+    return parser
+
+
+def write_output(events, out_path, args):
+    # Returns a short note on what was written, for the summary line
+    if not args.incremental:
+        extractor.export_ics(events, out_path)
+        return ""
+    delta_path = os.path.splitext(out_path)[0] + ".delta.ics"
+    stats = extractor.sync_ics(events, out_path, delta_path=delta_path)
+    return f" ({stats}; changes in {delta_path})"
+
+
+def combine(files, args, cache):
+    merger = EventMerger()
+    log.info("merging %d files", len(files))
+    combined = merge_files(files, merger, workers=args.workers, pages=args.pages,
+                           prescan=args.prescan, cache=cache, schema=args.schema)
+    for file_path, message in merger.failures:
+        print(f"{file_path}: failed: {message}", file=sys.stderr)
+    note = write_output(combined, args.combine, args)
+    if not args.quiet:
+        print(f"{len(combined)} events from {len(files) - len(merger.failures)} files "
+              f"({merger.summary()}) -> {args.combine}{note}")
+    return len(merger.failures)
+
+
+def watch_inputs(args, cache):
+    # Runs until interrupted; with --incremental each round's changes go to
+    # NAME.delta.ics
+    import watch
+    delta_path = os.path.splitext(args.combine)[0] + ".delta.ics" if args.incremental else None
+    calendar = watch.CombinedCalendar(args.combine, delta_path)
+    watcher = watch.FolderWatcher(args.inputs, calendar, recursive=args.recursive, workers=args.workers,
+                                  pages=args.pages, prescan=args.prescan, cache=cache, schema=args.schema,
+                                  settle=args.interval)
+
+    def on_round(ready, gone, stats, failures):
+        for file_path, message in failures:
+            print(f"{file_path}: failed: {message}", file=sys.stderr)
+        if not args.quiet:
+            print(f"{time.strftime('%H:%M:%S')} {len(ready)} changed, {len(gone)} removed files: {stats} "
+                  f"-> {args.combine} ({len(calendar)} events)", flush=True)
+
+    if not args.quiet:
+        print(f"Watching {', '.join(args.inputs)} every {args.interval:g} s (Ctrl+C to stop)", flush=True)
+    try:
+        watcher.run(args.interval, on_round)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    instrument.setup_logging(("info" if args.verbose == 1 else "debug") if args.verbose else None)
+    if args.profile:
+        with instrument.capture(args.profile):
+            return run(args)
+    if not args.trace:
+        return run(args)
+    instrument.recorder.enable()
+    try:
+        return run(args)
+    finally:
+        if args.trace_format == "json":
+            instrument.recorder.save_json(args.trace)
+        else:
+            instrument.recorder.save_chrome_trace(args.trace)
+        log.info("trace written to %s", args.trace)
+
+
+def run(args):
+    if args.watch and not args.combine:
+        print("--watch needs --combine FILE.", file=sys.stderr)
+        return 2
+    files = collect_inputs(args.inputs, recursive=args.recursive)
+    if not files and not args.watch:
+        print("No XLSM or PDF files found.", file=sys.stderr)
+        return 2
+    if args.schema:
+        try:
+            args.schema = load_schema(args.schema)
+        except SchemaError as e:
+            print(e, file=sys.stderr)
+            return 2
+    if not args.combine:
+        out_paths = {file_path: output_path(file_path, args.inputs, args.output_dir) for file_path in files}
+        collisions = output_collisions(out_paths)
+        if collisions:
+            for out_path, sources in collisions.items():
+                print(f"{out_path} would be written by {len(sources)} inputs: {', '.join(sources)}",
+                      file=sys.stderr)
+            print("Nothing written; convert them separately or use --combine.", file=sys.stderr)
+            return 2
+        os.makedirs(args.output_dir, exist_ok=True)
+    cache = None
+    if args.cache:
+        try:
+            cache = ParseCache(args.cache_dir)
+        except OSError as e:
+            print(f"Parse cache disabled: {e}", file=sys.stderr)
+    if args.watch:
+        return watch_inputs(args, cache)
+    if args.combine:
+        failures = combine(files, args, cache)
+    else:
+        failures = 0
+        for file_path in files:
+            log.info("parsing %s", file_path)
+            try:
+                with instrument.stage("file.parse", file=os.path.basename(file_path)):
+                    events = extractor.parse_file(file_path, workers=args.workers, pages=args.pages,
+                                                  prescan=args.prescan, cache=cache,
+                                                  all_sheets=args.all_sheets, schema=args.schema)
+            except Exception as e:
+                failures += 1
+                print(f"{file_path}: failed: {e}", file=sys.stderr)
+                continue
+            out_path = out_paths[file_path]
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            note = write_output(events, out_path, args)
+            if not args.quiet:
+                print(f"{file_path}: {len(events)} events -> {out_path}{note}")
+    if cache is not None:
+        cache.save_index()
+        if not args.quiet:
+            print(cache.stats_text())
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
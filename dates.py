@@ -0,0 +1,129 @@
+"""Date recognition shared by the parsers and the edit dialog."""
+import re
+from datetime import date, datetime, timedelta
+
+DEFAULT_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y")
+EXCEL_EPOCH = date(1899, 12, 30)
+# Serials outside this window (1954-2119) are more likely counts or codes
+EXCEL_SERIAL_RANGE = (20000, 80000)
+# Same pivot as strptime's %y: 69-99 -> 1900s, 00-68 -> 2000s
+TWO_DIGIT_PIVOT = 69
+
+_DIRECTIVES = {
+    "%Y": r"(?P<Y>\d{4})",
+    "%y": r"(?P<y>\d{2})",
+    "%m": r"(?P<m>\d{1,2})",
+    "%d": r"(?P<d>\d{1,2})",
+}
+_DIRECTIVE_RE = re.compile(r"%[Yymd]")
+
+
+def compile_format(fmt):
+    # "%d.%m.%Y" -> regex with named groups; literal parts are escaped
+    pattern = []
+    pos = 0
+    for m in _DIRECTIVE_RE.finditer(fmt):
+        pattern.append(re.escape(fmt[pos:m.start()]))
+        pattern.append(_DIRECTIVES[m.group()])
+        pos = m.end()
+    pattern.append(re.escape(fmt[pos:]))
+    rest = _DIRECTIVE_RE.sub("", fmt)
+    if "%" in rest:
+        raise ValueError(f"Unsupported date format directive in {fmt!r}")
+    return re.compile("".join(pattern))
+
+
+class DateRecognizer:
+    def __init__(self, formats=DEFAULT_FORMATS, excel_serials=True, cache_size=4096):
+        self.formats = tuple(formats)
+        self.excel_serials = excel_serials
+        self._patterns = [compile_format(fmt) for fmt in self.formats]
+        # Formats starting with a directive only match text starting with a
+        # digit, which rejects words cheaply; "KW %d.%m.%Y" needs the full check
+        self._digit_start = all(_DIRECTIVE_RE.match(fmt) for fmt in self.formats)
+        self._cache = {}
+        self._cache_size = cache_size
+
+    def recognize(self, value):
+        # Returns a datetime.date or None; never raises for unrecognized input
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            return self._recognize_str(value)
+        if self.excel_serials and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return self._from_serial(value)
+        return None
+
+    def _recognize_str(self, text):
+        try:
+            return self._cache[text]
+        except KeyError:
+            pass
+        s = text.strip()
+        result = None
+        if s and (s[0].isdigit() or not self._digit_start):
+            for pattern in self._patterns:
+                m = pattern.fullmatch(s)
+                if m:
+                    result = self._from_match(m)
+                    if result:
+                        break
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[text] = result
+        return result
+
+    def mentions_date(self, text):
+        # True if running text may contain a date in one of the formats (for
+        # the PDF pre-scan; the match is not validated)
+        return any(pattern.search(text) for pattern in self._patterns)
+
+    def _from_match(self, m):
+        groups = m.groupdict()
+        if groups.get("Y"):
+            year = int(groups["Y"])
+        else:
+            year = int(groups["y"])
+            year += 1900 if year >= TWO_DIGIT_PIVOT else 2000
+        try:
+            return date(year, int(groups["m"]), int(groups["d"]))
+        except ValueError:
+            return None  # e.g. 31.02.2024
+
+    def _from_serial(self, serial):
+        low, high = EXCEL_SERIAL_RANGE
+        if low <= serial < high:
+            return EXCEL_EPOCH + timedelta(days=int(serial))
+        return None
+
+    def find_date_column(self, rows, exclude=(), sample=50):
+        # Pick the column that holds a date in most of the first `sample` rows
+        # so the per-row loop only has to look at one cell. Ties go to the
+        # leftmost column, matching the old "first date cell" behaviour.
+        # Real dates (date/datetime cells, matching strings) beat Excel
+        # serials: order numbers, row IDs and postal codes look like serials
+        # too, so a serials-only column is used only if nothing else has dates.
+        dated = {}
+        serials = {}
+        for row in rows[:sample]:
+            for idx, cell in enumerate(row):
+                if idx in exclude:
+                    continue
+                if self.recognize(cell) is not None:
+                    counts = serials if isinstance(cell, (int, float)) else dated
+                    counts[idx] = counts.get(idx, 0) + 1
+        counts = dated or serials
+        if not counts:
+            return None
+        return max(sorted(counts), key=lambda idx: counts[idx])
+
+
+default_recognizer = DateRecognizer()
+
+
+def parse_date(value, recognizer=None):
+    return (recognizer or default_recognizer).recognize(value)
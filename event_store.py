@@ -0,0 +1,130 @@
+"""Compact in-memory event store with stable event IDs.
+
+Events are kept as __slots__ records: dates as proleptic ordinals, and event
+types / project codes interned so the handful of distinct values is stored
+once. Records still support event["date"]-style access, so code written for
+the old list of dicts (search index, ICS export) keeps working.
+"""
+from datetime import date
+
+FIELDS = ("date", "event_type", "project_code", "notes")
+
+
+class EventRecord:
+    __slots__ = ("id", "ordinal", "event_type", "project_code", "notes")
+
+    def __init__(self, event_id, ordinal, event_type, project_code, notes):
+        self.id = event_id
+        self.ordinal = ordinal
+        self.event_type = event_type
+        self.project_code = project_code
+        self.notes = notes
+
+    @property
+    def date(self):
+        return date.fromordinal(self.ordinal).isoformat()
+
+    def __getitem__(self, field):
+        if field not in FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def values(self):
+        return (self.date, self.event_type, self.project_code, self.notes)
+
+    def as_dict(self):
+        return dict(zip(FIELDS, self.values()))
+
+
+class EventStore:
+    def __init__(self, events=()):
+        self._records = {}  # id -> EventRecord, in insertion order
+        self._next_id = 1
+        self._interned = {"": ""}
+        self._ordinals = {}
+        self.extend(events)
+
+    def _intern(self, value):
+        value = str(value)
+        return self._interned.setdefault(value, value)
+
+    def _ordinal(self, value):
+        # Schedules repeat dates a lot; caching shares one int object per day
+        # and skips re-parsing the ISO string
+        if isinstance(value, int):
+            return value
+        try:
+            return self._ordinals[value]
+        except KeyError:
+            ordinal = self._ordinals[value] = date.fromisoformat(value).toordinal()
+            return ordinal
+
+    def add(self, event):
+        event_id = self._next_id
+        self._next_id += 1
+        self._records[event_id] = EventRecord(
+            event_id,
+            self._ordinal(event["date"]),
+            self._intern(event["event_type"]),
+            self._intern(event["project_code"]),
+            self._intern(event.get("notes", "")),
+        )
+        return event_id
+
+    def extend(self, events):
+        return [self.add(event) for event in events]
+
+    def update(self, event_id, event):
+        record = self._records[event_id]
+        record.ordinal = self._ordinal(event["date"])
+        record.event_type = self._intern(event["event_type"])
+        record.project_code = self._intern(event["project_code"])
+        record.notes = self._intern(event.get("notes", ""))
+        return record
+
+    def set_notes(self, event_id, notes):
+        self._records[event_id].notes = notes
+
+    def set_notes_many(self, event_ids, notes):
+        notes = self._intern(notes)
+        records = self._records
+        for event_id in event_ids:
+            records[event_id].notes = notes
+
+    def remove(self, event_id):
+        del self._records[event_id]
+
+    def remove_many(self, event_ids):
+        # One dict delete per ID: linear in the selection, independent of
+        # where the events sit in the table
+        records = self._records
+        removed = 0
+        for event_id in event_ids:
+            if records.pop(event_id, None) is not None:
+                removed += 1
+        return removed
+
+    def clear(self):
+        self._records.clear()
+
+    def __getitem__(self, event_id):
+        return self._records[event_id]
+
+    def __contains__(self, event_id):
+        return event_id in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def record_getter(self):
+        # Plain dict lookup for hot loops (sort keys), skipping __getitem__
+        return self._records.__getitem__
+
+    def ids(self):
+        return list(self._records)
+
+    def items(self):
+        return self._records.items()
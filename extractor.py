@@ -0,0 +1,514 @@
+"""GUI-free extraction engine shared by the Tk app and the batch CLI.
+
+Nothing in here may import tkinter or ttkthemes so it can run on headless boxes.
+"""
+import hashlib
+import itertools
+import os
+import time
+import cache as parse_cache
+import dates
+import ics
+import instrument
+import ics_sync
+from schema import default_schema
+
+# Bump whenever parsing changes what events a file yields, so stale cache
+# entries are never served
+PARSER_VERSION = 4
+SUPPORTED_EXTENSIONS = (".xlsm", ".pdf")
+# Calendars can be read back in too, but are not picked up when scanning
+# directories for schedules (they are usually this tool's own output)
+CALENDAR_EXTENSIONS = (".ics",)
+# Table detection is CPU-bound per page; below this many pages per worker the
+# process start-up cost outweighs the gain
+PAGES_PER_WORKER = 8
+# Rows looked at to decide which column holds the dates
+DATE_SAMPLE_ROWS = 50
+
+
+class NoTableFoundError(ValueError):
+    pass
+
+
+def make_event(date_str, event_type, project_code, notes=""):
+    return {
+        "date": date_str,
+        "event_type": event_type,
+        "project_code": project_code,
+        "notes": notes,
+    }
+
+
+class RowEventBuilder:
+    # Turns table rows into events. The date column is detected once from the
+    # first DATE_SAMPLE_ROWS rows, then each row only has its date cell looked
+    # at. Rows can be fed in batches as they arrive (streamed sheets, PDF
+    # pages); events come back as soon as the date column is known.
+    def __init__(self, event_columns, recognizer=None):
+        self.event_columns = event_columns
+        self.recognizer = recognizer or dates.default_recognizer
+        self.date_col = None
+        self._head = []
+        self._decided = False
+
+    def feed(self, rows):
+        if not self._decided:
+            self._head.extend(rows)
+            if len(self._head) < DATE_SAMPLE_ROWS:
+                return []
+            return self._decide()
+        return self._build(rows)
+
+    def finish(self):
+        if not self._decided:
+            return self._decide()
+        return []
+
+    def _decide(self):
+        self._decided = True
+        head, self._head = self._head, []
+        with instrument.stage("rows.find_date_column"):
+            self.date_col = self.recognizer.find_date_column(
+                head, exclude={idx for idx, _ in self.event_columns}, sample=DATE_SAMPLE_ROWS)
+        return self._build(head)
+
+    def _build(self, rows):
+        recognize = self.recognizer.recognize
+        if not instrument.recorder.enabled:
+            return list(self._events(rows, recognize))
+        # Split the time between recognizing dates and building events
+        parse_time = 0.0
+
+        def timed_recognize(value):
+            nonlocal parse_time
+            start = time.perf_counter()
+            try:
+                return recognize(value)
+            finally:
+                parse_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        events = list(self._events(rows, timed_recognize))
+        instrument.add_time("rows.date_parse", parse_time)
+        instrument.add_time("rows.event_build", time.perf_counter() - start - parse_time)
+        instrument.count("rows.scanned", len(rows))
+        instrument.count("events.built", len(events))
+        return events
+
+    def _events(self, rows, recognize):
+        date_col = self.date_col
+        if date_col is None:
+            return
+        event_columns = self.event_columns
+        for row in rows:
+            # Rows can be shorter than the header row (read-only sheets, PDF tables)
+            if date_col >= len(row):
+                continue
+            date_val = recognize(row[date_col])
+            if date_val is None:
+                continue  # Skip if no valid date found
+            date_str = date_val.isoformat()
+            # For each allowed event column that is non-empty, create an event
+            for idx, col_name in event_columns:
+                if idx >= len(row):
+                    continue
+                project_code = row[idx]
+                if project_code and str(project_code).strip():
+                    yield make_event(date_str, col_name, str(project_code).strip())
+
+
+def iter_row_events(rows, event_columns, recognizer=None, batch=1000):
+    builder = RowEventBuilder(event_columns, recognizer)
+    rows = iter(rows)
+    while True:
+        start = time.perf_counter()
+        chunk = list(itertools.islice(rows, batch))
+        instrument.add_time("xlsm.row_scan", time.perf_counter() - start)
+        if not chunk:
+            break
+        yield from builder.feed(chunk)
+    yield from builder.finish()
+
+
+def _raise(error):
+    raise error
+
+
+def collect_inputs(paths, recursive=False, strict=False):
+    # Input files and directories -> schedule files; directories are listed
+    # in name order (shared by the batch CLI and watch mode). strict raises
+    # OSError for subdirectories that cannot be listed instead of skipping
+    # them.
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                walker = os.walk(path, onerror=_raise if strict else None)
+            else:
+                walker = [(path, [], os.listdir(path))]
+            for root, _dirs, names in walker:
+                for name in sorted(names):
+                    # Skip Office lock files (~$name.xlsm) and hidden temp files
+                    if name.startswith(("~$", ".")):
+                        continue
+                    if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return files
+
+
+def config_fingerprint(recognizer=None, schema=None):
+    # Everything besides the file content that decides which events come out
+    recognizer = recognizer or dates.default_recognizer
+    schema = schema or default_schema()
+    return (PARSER_VERSION, schema.fingerprint, DATE_SAMPLE_ROWS,
+            recognizer.formats, recognizer.excel_serials)
+
+
+def _cached_events(cache, key, iter_events):
+    # Serves a whole file from the cache, or streams it and stores the result
+    # once the file has been read to the end
+    packed = cache.get(key)
+    if packed is not None:
+        yield from parse_cache.unpack_events(packed)
+        return
+    events = []
+    for event in iter_events():
+        events.append(event)
+        yield event
+    cache.put(key, parse_cache.pack_events(events))
+
+
+def iter_xlsm_events(file_path, read_only=True, recognizer=None, cache=None, all_sheets=False,
+                     schema=None):
+    schema = schema or default_schema()
+    if cache is not None:
+        key = cache.key("xlsm", config_fingerprint(recognizer, schema), all_sheets,
+                        cache.file_digest(file_path))
+        yield from _cached_events(cache, key, lambda: iter_xlsm_events(
+            file_path, read_only=read_only, recognizer=recognizer, all_sheets=all_sheets, schema=schema))
+        return
+    # read_only streams rows lazily so memory stays flat regardless of sheet size;
+    # read_only=False builds the full workbook object model (the old behaviour).
+    # openpyxl is imported here, like pdfplumber, to keep start-up fast.
+    from openpyxl import load_workbook
+    with instrument.stage("xlsm.open", file=os.path.basename(file_path)):
+        wb = load_workbook(file_path, data_only=True, read_only=read_only)
+    try:
+        # all_sheets reads every worksheet with known event headers; by
+        # default only the active one, as the GUI always did
+        for ws in (wb.worksheets if all_sheets else [wb.active]):
+            if read_only:
+                # Read-only sheets trust the stored <dimension>, which some
+                # writers leave at A1; rows beyond it would be dropped
+                ws.reset_dimensions()
+            rows = ws.iter_rows(values_only=True)
+            head = list(itertools.islice(rows, schema.header_search_rows))
+            header_idx, event_columns = schema.find_header(head)
+            if event_columns:
+                rows = itertools.chain(head[header_idx + 1:], rows)
+                yield from iter_row_events(rows, event_columns, recognizer)
+    finally:
+        wb.close()
+
+
+def parse_xlsm(file_path, read_only=True, recognizer=None, cache=None, all_sheets=False, schema=None):
+    return list(iter_xlsm_events(file_path, read_only=read_only, recognizer=recognizer, cache=cache,
+                                 all_sheets=all_sheets, schema=schema))
+
+
+def page_may_have_table(page, schema=None, recognizer=None):
+    # Cheap pre-scan on the raw chars: only pages mentioning a known header or
+    # a date in one of the recognizer's formats can hold schedule rows, so
+    # everything else skips the table finder.
+    text = "".join(c["text"] for c in page.chars)
+    if (schema or default_schema()).mentions_header(text):
+        return True
+    return (recognizer or dates.default_recognizer).mentions_date(text)
+
+
+def parse_page_ranges(spec, page_count):
+    # "1-3,7,10-" -> [1, 2, 3, 7, 10, ..., page_count]
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, _, last = part.partition("-")
+            first = int(first) if first.strip() else 1
+            last = int(last) if last.strip() else page_count
+        else:
+            first = last = int(part)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part}")
+        pages.update(range(first, min(last, page_count) + 1))
+    return sorted(pages)
+
+
+def _extract_page_range(file_path, page_numbers, prescan=True, schema=None, recognizer=None):
+    # Runs inside pool workers: each worker opens its own handle on the PDF
+    import pdfplumber
+    results = []
+    with instrument.stage("pdf.open", pages=len(page_numbers)):
+        pdf = pdfplumber.open(file_path, pages=page_numbers)
+    with pdf:
+        for page in pdf.pages:
+            with instrument.stage("pdf.prescan", page=page.page_number):
+                skip = prescan and not page_may_have_table(page, schema, recognizer)
+            if skip:
+                instrument.count("pdf.pages_skipped")
+                results.append((page.page_number, []))
+            else:
+                with instrument.stage("pdf.extract_tables", page=page.page_number):
+                    results.append((page.page_number, page.extract_tables()))
+            page.close()
+    return results
+
+
+def _split_pages(page_numbers, workers):
+    # Several chunks per worker so one slow range does not idle the others
+    # (and an in-process run still reports progress as it goes)
+    chunks = max(1, min(len(page_numbers), workers * 4))
+    size = -(-len(page_numbers) // chunks)
+    return [page_numbers[i:i + size] for i in range(0, len(page_numbers), size)]
+
+
+def pdf_page_count(file_path):
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def resolve_pages(file_path, pages=None):
+    # Page numbers (1-based) to look at; pages is an optional range spec
+    page_count = pdf_page_count(file_path)
+    if pages:
+        return parse_page_ranges(pages, page_count)
+    return list(range(1, page_count + 1))
+
+
+def _object_digest(obj, memo):
+    # Digest of a PDF object and everything it references. memo maps object
+    # IDs to digests, so fonts and XObjects shared by many pages are hashed
+    # once per file.
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+    if isinstance(obj, PDFObjRef):
+        digest = memo.get(obj.objid)
+        if digest is None:
+            memo[obj.objid] = b"cycle"  # a reference back to an object being hashed
+            digest = memo[obj.objid] = _object_digest(obj.resolve(), memo)
+        return digest
+    h = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        h.update(b"stream")
+        h.update(_object_digest(obj.attrs, memo))
+        data = obj.get_rawdata()
+        h.update(obj.get_data() if data is None else data)
+    elif isinstance(obj, dict):
+        for key in sorted(obj):
+            h.update(repr(key).encode())
+            h.update(_object_digest(obj[key], memo))
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            h.update(_object_digest(item, memo))
+    else:
+        h.update(repr(obj).encode())
+    return h.digest()
+
+
+def page_digests(file_path, page_numbers):
+    # Content hash per page: the page's content streams, geometry and
+    # resources (Form XObjects it draws, fonts with their encodings and
+    # ToUnicode maps), any of which changes the extracted text. Reading the
+    # streams is far cheaper than table detection, so an edited PDF can be
+    # checked page by page.
+    import pdfplumber
+    from pdfminer.pdftypes import resolve1
+    digests = {}
+    memo = {}
+    with pdfplumber.open(file_path, pages=page_numbers) as pdf:
+        for page in pdf.pages:
+            h = hashlib.sha256(repr((page.page_obj.mediabox, page.page_obj.rotate)).encode())
+            for stream in page.page_obj.contents:
+                stream = resolve1(stream)
+                if stream is not None:
+                    h.update(stream.get_data())
+            h.update(_object_digest(page.page_obj.resources, memo))
+            digests[page.page_number] = h.hexdigest()
+    return digests
+
+
+def _iter_extracted_tables(file_path, page_numbers, workers=None, prescan=True, schema=None, recognizer=None):
+    if not page_numbers:
+        return
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(page_numbers) // PAGES_PER_WORKER)
+    if workers <= 1 or len(page_numbers) < 2:
+        for chunk in _split_pages(page_numbers, 1):
+            yield from _extract_page_range(file_path, chunk, prescan, schema, recognizer)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers)
+    futures = []
+    try:
+        # Results are taken in submission order, so pages come back in order
+        futures = [pool.submit(_extract_page_range, file_path, chunk, prescan, schema, recognizer)
+                   for chunk in _split_pages(page_numbers, workers)]
+        for future in futures:
+            # Pages extracted in the workers are not traced one by one; the
+            # time spent waiting for them is
+            start = time.perf_counter()
+            chunk_result = future.result()
+            instrument.add_time("pdf.pool_wait", time.perf_counter() - start)
+            yield from chunk_result
+    except BaseException:
+        # Includes GeneratorExit when the consumer stops early (cancelled
+        # import): drop the chunks that have not started yet
+        # (shutdown(cancel_futures=True) needs Python 3.9)
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+        raise
+    pool.shutdown()
+
+
+def iter_page_tables(file_path, page_numbers, workers=None, prescan=True, cache=None, schema=None,
+                     recognizer=None):
+    # Yields (page_number, tables) in page order as pages finish. workers=None
+    # picks a pool size from the page count; workers=1 extracts in-process.
+    # With a cache, pages whose content is unchanged are served from it and
+    # only the remaining pages go through table detection.
+    if cache is None:
+        yield from _iter_extracted_tables(file_path, page_numbers, workers, prescan, schema, recognizer)
+        return
+    if not page_numbers:
+        return
+    # The pre-scan looks for the known headers and date formats, so they are
+    # part of the key
+    prescan_key = False
+    if prescan:
+        prescan_key = ((schema or default_schema()).fingerprint,
+                       (recognizer or dates.default_recognizer).formats)
+    with instrument.stage("pdf.page_digests", pages=len(page_numbers)):
+        digests = page_digests(file_path, page_numbers)
+    keys = {number: cache.key("pdf-page", PARSER_VERSION, prescan_key, digest)
+            for number, digest in digests.items()}
+    cached = {}
+    missing = []
+    for number in page_numbers:
+        tables = cache.get(keys[number])
+        if tables is None:
+            missing.append(number)
+        else:
+            cached[number] = tables
+    instrument.count("pdf.pages_cached", len(cached))
+    extracted = _iter_extracted_tables(file_path, missing, workers, prescan, schema, recognizer)
+    try:
+        for number in page_numbers:
+            if number in cached:
+                yield number, cached.pop(number)
+                continue
+            number, tables = next(extracted)
+            cache.put(keys[number], tables)
+            yield number, tables
+    finally:
+        extracted.close()
+
+
+def extract_pdf_tables(file_path, workers=None, pages=None, prescan=True, cache=None, schema=None,
+                       recognizer=None):
+    # Returns [(page_number, tables), ...] in page order
+    return list(iter_page_tables(file_path, resolve_pages(file_path, pages), workers, prescan, cache,
+                                 schema, recognizer))
+
+
+def iter_pdf_events(file_path, workers=None, pages=None, prescan=True, recognizer=None, progress=None,
+                    cache=None, schema=None):
+    schema = schema or default_schema()
+    if cache is not None:
+        # Whole-file entry first; on a miss the per-page entries still spare
+        # table detection on every page that did not change
+        key = cache.key("pdf", config_fingerprint(recognizer, schema), pages or "", prescan,
+                        cache.file_digest(file_path))
+        yield from _cached_events(cache, key, lambda: _iter_pdf_events(
+            file_path, workers, pages, prescan, recognizer, progress, cache, schema))
+        return
+    yield from _iter_pdf_events(file_path, workers, pages, prescan, recognizer, progress, None, schema)
+
+
+def _iter_pdf_events(file_path, workers=None, pages=None, prescan=True, recognizer=None, progress=None,
+                     cache=None, schema=None):
+    # Events are yielded as their pages come in. A table with a header row
+    # naming event columns (searched as deep as the schema allows) starts a
+    # new logical table; a header-less
+    # table with the same column count on a later page continues the previous
+    # one. progress(pages_done, pages_total) is called after every page.
+    page_numbers = resolve_pages(file_path, pages)
+    builder = None
+    width = None
+    found_table = False
+    for done, (_page_number, tables) in enumerate(
+            iter_page_tables(file_path, page_numbers, workers, prescan, cache, schema, recognizer), start=1):
+        for table in tables:
+            if not table:
+                continue
+            found_table = True
+            header_idx, event_columns = schema.find_header(table)
+            if event_columns:
+                if builder is not None:
+                    yield from builder.finish()
+                builder = RowEventBuilder(event_columns, recognizer)
+                width = len(table[header_idx])
+                yield from builder.feed(table[header_idx + 1:])
+            elif builder is not None and len(table[0]) == width:
+                yield from builder.feed(table)
+            # Anything else (legend boxes, footers) is ignored without ending
+            # the current table, so a legend page between two table pages
+            # does not cut the schedule in half
+        if progress:
+            progress(done, len(page_numbers))
+    if builder is not None:
+        yield from builder.finish()
+    if not found_table:
+        raise NoTableFoundError("No table found in PDF.")
+
+
+def parse_pdf(file_path, workers=None, pages=None, prescan=True, recognizer=None, cache=None, schema=None):
+    return list(iter_pdf_events(file_path, workers=workers, pages=pages, prescan=prescan,
+                                recognizer=recognizer, cache=cache, schema=schema))
+
+
+def iter_ics_events(file_path, progress=None):
+    return ics.iter_ics_events(file_path, progress=progress)
+
+
+def parse_ics(file_path):
+    return list(iter_ics_events(file_path))
+
+
+def parse_file(file_path, workers=None, pages=None, prescan=True, recognizer=None, cache=None,
+               all_sheets=False, schema=None):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".xlsm":
+        return parse_xlsm(file_path, recognizer=recognizer, cache=cache, all_sheets=all_sheets,
+                          schema=schema)
+    if ext == ".pdf":
+        return parse_pdf(file_path, workers=workers, pages=pages, prescan=prescan,
+                         recognizer=recognizer, cache=cache, schema=schema)
+    if ext in CALENDAR_EXTENSIONS:
+        return parse_ics(file_path)
+    raise ValueError(f"Unsupported file type: {ext or file_path}")
+
+
+def export_ics(events, file_path, progress=None):
+    return ics.write_ics(events, file_path, progress=progress)
+
+
+def sync_ics(events, file_path, delta_path=None, progress=None):
+    # Incremental export against what was written to file_path last time;
+    # returns ics_sync.SyncStats
+    return ics_sync.sync_ics(events, file_path, delta_path=delta_path, progress=progress)
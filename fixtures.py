@@ -0,0 +1,167 @@
+"""Synthetic schedule generators used by bench.py.
+
+Also usable on their own to produce test inputs of any size:
+
+    python fixtures.py xlsm plan.xlsm --rows 50000 --sheets 3
+    python fixtures.py pdf plan.pdf --table-pages 200 --text-pages 20
+"""
+import argparse
+import zlib
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+
+XLSM_HEADERS = ["Datum", "Projekt", "Zustellung zu CCR", "CCR", "Zustellung zu ITV", "Bemerkung"]
+
+
+def make_xlsm(file_path, rows=10000, sheets=1, offset_days=0):
+    # write_only keeps the generator itself from dominating memory for big fixtures.
+    # offset_days shifts the schedule, so neighbouring fixtures overlap partly.
+    wb = Workbook(write_only=True)
+    start = datetime(2024, 1, 1) + timedelta(days=offset_days)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Plan {s + 1}")
+        ws.append(XLSM_HEADERS)
+        for i in range(rows):
+            ws.append([
+                start + timedelta(days=i % 3650),
+                f"Projekt {i % 97}",
+                f"P{4700 + i % 500}" if i % 3 == 0 else None,
+                f"C{i % 1000}" if i % 2 == 0 else None,
+                f"I{i % 250}" if i % 5 == 0 else None,
+                "",
+            ])
+    wb.save(file_path)
+    return file_path
+
+
+PDF_HEADERS = ["Datum", "Projekt", "Zustellung zu CCR", "CCR", "Zustellung zu ITV"]
+PAGE_W, PAGE_H = 595, 842  # A4 in points
+
+
+def _pdf_text(x, y, text, size=8):
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({text}) Tj ET"
+
+
+def _table_page(rows, header, top=800, row_h=16, col_w=105, left=30):
+    ops = ["0.5 w"]
+    lines = ([header] if header else []) + rows
+    bottom = top - row_h * len(lines)
+    right = left + col_w * len(PDF_HEADERS)
+    for r in range(len(lines) + 1):
+        y = top - r * row_h
+        ops.append(f"{left} {y} m {right} {y} l S")
+    for c in range(len(PDF_HEADERS) + 1):
+        x = left + c * col_w
+        ops.append(f"{x} {top} m {x} {bottom} l S")
+    for r, line in enumerate(lines):
+        y = top - (r + 1) * row_h + 5
+        for c, value in enumerate(line):
+            if value:
+                ops.append(_pdf_text(left + c * col_w + 3, y, value))
+    return ops
+
+
+def _text_page(title, paragraphs=30):
+    # Cover/legend page: ruled legend boxes but no headers or dates, like the
+    # real exports' legends
+    ops = [_pdf_text(50, 780, title, size=18), "0.5 w"]
+    for i in range(paragraphs):
+        y = 740 - i * 20
+        ops.append(f"45 {y - 6} 500 18 re S")
+        ops.append(f"120 {y - 6} m 120 {y + 12} l S")
+        ops.append(_pdf_text(50, y, f"L{i + 1}"))
+        ops.append(_pdf_text(125, y, "Hinweise zur Planung und Abstimmung mit den Partnern."))
+    return ops
+
+
+def write_pdf(file_path, pages, form=None):
+    # Minimal PDF 1.4 writer: each page is a list of content stream operators.
+    # form: operators of a Form XObject every page can draw with "/Fm1 Do"
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    xobjects = ""
+    if form is not None:
+        stream = zlib.compress("\n".join(form).encode("latin-1"))
+        objects.append(b"<< /Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Length %d /Filter /FlateDecode >>\nstream\n" % (PAGE_W, PAGE_H, len(stream))
+                       + stream + b"\nendstream")
+        xobjects = f" /XObject << /Fm1 {len(objects)} 0 R >>"
+    kids = []
+    for ops in pages:
+        stream = zlib.compress("\n".join(ops).encode("latin-1"))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >>%s >> "
+                        "/Contents %d 0 R >>" % (PAGE_W, PAGE_H, xobjects, content_ref)).encode())
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(file_path, "wb") as f:
+        f.write(out)
+    return file_path
+
+
+def make_pdf(file_path, table_pages=20, text_pages=0, rows_per_page=45, repeat_header=False):
+    # text_pages cover/legend pages are spread evenly between the table pages
+    start = datetime(2024, 1, 1)
+    pages = [_text_page("Projektplanung")] if text_pages else []
+    text_left = max(text_pages - 1, 0)
+    every = table_pages // text_left + 1 if text_left else 0
+    n = 0
+    for p in range(table_pages):
+        rows = []
+        for _ in range(rows_per_page):
+            day = start + timedelta(days=n % 3650)
+            rows.append([
+                day.strftime("%d.%m.%Y"),
+                f"Projekt {n % 97}",
+                f"P{4700 + n % 500}" if n % 3 == 0 else "",
+                f"C{n % 1000}" if n % 2 == 0 else "",
+                f"I{n % 250}" if n % 5 == 0 else "",
+            ])
+            n += 1
+        header = PDF_HEADERS if p == 0 or repeat_header else None
+        pages.append(_table_page(rows, header))
+        if every and (p + 1) % every == 0 and text_left:
+            pages.append(_text_page(f"Legende {p + 1}"))
+            text_left -= 1
+    while text_left:
+        pages.append(_text_page("Anhang"))
+        text_left -= 1
+    return write_pdf(file_path, pages)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic schedule fixtures.")
+    sub = parser.add_subparsers(dest="kind", required=True)
+    p = sub.add_parser("xlsm", help="workbook with the usual event columns")
+    p.add_argument("output")
+    p.add_argument("--rows", type=int, default=10000)
+    p.add_argument("--sheets", type=int, default=1)
+    p.add_argument("--offset-days", type=int, default=0)
+    p = sub.add_parser("pdf", help="ruled table pages, optionally with legend pages in between")
+    p.add_argument("output")
+    p.add_argument("--table-pages", type=int, default=20)
+    p.add_argument("--text-pages", type=int, default=0)
+    p.add_argument("--rows-per-page", type=int, default=45)
+    p.add_argument("--repeat-header", action="store_true")
+    args = parser.parse_args(argv)
+    if args.kind == "xlsm":
+        make_xlsm(args.output, rows=args.rows, sheets=args.sheets, offset_days=args.offset_days)
+    else:
+        make_pdf(args.output, table_pages=args.table_pages, text_pages=args.text_pages,
+                 rows_per_page=args.rows_per_page, repeat_header=args.repeat_header)
+    print(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Streaming iCalendar (.ics) writer and reader.
+
+VEVENTs are serialized one at a time and flushed in chunks between the
+VCALENDAR header and footer, so the calendar never exists in memory as a
+whole. Output goes to a temp file next to the target and is renamed into
+place, so a failed export never leaves a truncated .ics behind.
+
+Every VEVENT gets a UID derived from its date, type and project code, so
+re-exports of the same schedule update events in calendar clients instead
+of duplicating them.
+
+Reading goes line by line as well: lines are unfolded on the fly and only
+the properties the event model uses are kept, so a large calendar is never
+built up as a component tree.
+"""
+import hashlib
+import os
+import time
+from datetime import date
+from functools import lru_cache
+import instrument
+from atomicfile import atomic_write
+
+PRODID = "-//iCal Event Extractor//mxm.dk//"
+CRLF = "\r\n"
+HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:" + PRODID + CRLF
+FOOTER = "END:VCALENDAR\r\n"
+CHUNK_EVENTS = 1000
+MAX_LINE_OCTETS = 75
+SUMMARY_SEP = ": "
+_UNESCAPES = {"n": "\n", "N": "\n", "\\": "\\", ";": ";", ",": ",", ":": ":"}
+UID_DOMAIN = "ical-event-extractor"
+
+
+def escape_text(value):
+    # RFC 5545 TEXT escaping, same as icalendar's vText
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold_line(line):
+    # Fold below 75 octets the way icalendar does, without splitting a UTF-8
+    # sequence or a backslash escape across lines
+    if len(line) < MAX_LINE_OCTETS and line.isascii():
+        return line
+    parts = []
+    current = []
+    size = 0
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if current and size + width >= MAX_LINE_OCTETS:
+            carry = current.pop() if len(current) > 1 and current[-1] == "\\" else ""
+            parts.append("".join(current))
+            current = [carry] if carry else []
+            size = len(carry)
+        current.append(ch)
+        size += width
+    parts.append("".join(current))
+    return (CRLF + " ").join(parts)
+
+
+class DateFormatter:
+    # Each distinct date string / ordinal is parsed once per export
+    def __init__(self):
+        self._cache = {}
+
+    def __call__(self, event):
+        key = getattr(event, "ordinal", None)
+        if key is None:
+            key = event["date"]
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        try:
+            if isinstance(key, int):
+                value = date.fromordinal(key).strftime("%Y%m%d")
+            else:
+                value = date.fromisoformat(key).strftime("%Y%m%d")
+        except (TypeError, ValueError):
+            value = None  # Skip events with invalid dates
+        self._cache[key] = value
+        return value
+
+
+def event_uid(event, occurrence=1):
+    # Deterministic UID from the identity fields; later occurrences of the
+    # same identity get -2, -3, ... suffixes
+    identity = "\0".join((str(event["date"]), str(event["event_type"]), str(event["project_code"])))
+    digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:32]
+    if occurrence > 1:
+        digest = f"{digest}-{occurrence}"
+    return f"{digest}@{UID_DOMAIN}"
+
+
+class UidAssigner:
+    # UIDs for one export. Should the same identity occur more than once,
+    # later copies get suffixes so UIDs stay unique within the calendar.
+    def __init__(self):
+        self._seen = {}
+
+    def __call__(self, event):
+        identity = (str(event["date"]), str(event["event_type"]), str(event["project_code"]))
+        count = self._seen[identity] = self._seen.get(identity, 0) + 1
+        return event_uid(event, count)
+
+
+def serialize_event(event, ical_date, extra_lines=()):
+    lines = [
+        "BEGIN:VEVENT",
+        fold_line(f"SUMMARY:{escape_text(event['event_type'])}: {escape_text(event['project_code'])}"),
+        f"DTSTART;VALUE=DATE:{ical_date}",
+        f"DTEND;VALUE=DATE:{ical_date}",
+        fold_line(f"DESCRIPTION:{escape_text(event['notes'])}"),
+        "TRANSP:TRANSPARENT",
+        "X-MICROSOFT-CDO-ALLDAYEVENT:TRUE",
+    ]
+    lines.extend(extra_lines)
+    lines.append("END:VEVENT")
+    return CRLF.join(lines) + CRLF
+
+
+def iter_vevents(events):
+    format_date = DateFormatter()
+    assign_uid = UidAssigner()
+    for event in events:
+        ical_date = format_date(event)
+        if ical_date is None:
+            continue
+        yield serialize_event(event, ical_date, (f"UID:{assign_uid(event)}",))
+
+
+def write_ics(events, file_path, chunk_events=CHUNK_EVENTS, progress=None):
+    return write_vevents(iter_vevents(events), file_path, chunk_events, progress)
+
+
+def write_vevents(vevents, file_path, chunk_events=CHUNK_EVENTS, progress=None, header=HEADER):
+    # Writes already serialized VEVENTs; returns how many. progress(written)
+    # is called after every flushed chunk; an exception raised from it aborts
+    # the export and leaves any existing file untouched.
+    with instrument.stage("ics.export", file=os.path.basename(file_path)):
+        written = _write_vevents(vevents, file_path, chunk_events, progress, header)
+    instrument.count("ics.events_written", written)
+    return written
+
+
+def _write_vevents(vevents, file_path, chunk_events, progress, header):
+    # ics.export minus ics.file_write is the serialization time. Replacing
+    # a calendar keeps its file mode.
+    written = 0
+    with atomic_write(file_path, keep_mode=True, suffix=".ics.tmp") as f:
+        write = f.write
+        if instrument.recorder.enabled:
+            def write(text, _write=f.write):
+                start = time.perf_counter()
+                _write(text)
+                instrument.add_time("ics.file_write", time.perf_counter() - start)
+        write(header)
+        chunk = []
+        for vevent in vevents:
+            chunk.append(vevent)
+            if len(chunk) >= chunk_events:
+                write("".join(chunk))
+                written += len(chunk)
+                chunk.clear()
+                if progress:
+                    progress(written)
+        write("".join(chunk))
+        written += len(chunk)
+        write(FOOTER)
+    return written
+
+
+def unescape_text(value):
+    if "\\" not in value:
+        return value
+    out = []
+    chars = iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append(_UNESCAPES.get(nxt, nxt))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def split_property(line):
+    # "NAME;PARAM=x:value" -> ("NAME", "value"); a colon inside a quoted
+    # parameter value does not end the name part
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            return line[:i].partition(";")[0].upper(), line[i + 1:]
+    return line.partition(";")[0].upper(), ""
+
+
+def iter_unfolded_lines(f):
+    # f is a binary file; yields (logical line, bytes read so far). Lines
+    # are unfolded as bytes and decoded afterwards: other producers may fold
+    # inside a multi-byte UTF-8 character (RFC 5545 3.1).
+    current = None
+    for raw in f:
+        line = raw.rstrip(b"\r\n")
+        if line[:1] in (b" ", b"\t") and current is not None:
+            current.append(line[1:])
+            continue
+        if current is not None:
+            yield b"".join(current).decode("utf-8"), f.tell()
+        current = [line]
+    if current is not None:
+        yield b"".join(current).decode("utf-8"), f.tell()
+
+
+@lru_cache(maxsize=4096)
+def _iso_date(ical_date):
+    # "20240131" -> "2024-01-31"; None for anything that is not a real date
+    if len(ical_date) != 8 or not ical_date.isdigit():
+        return None
+    try:
+        return date(int(ical_date[:4]), int(ical_date[4:6]), int(ical_date[6:])).isoformat()
+    except ValueError:
+        return None  # e.g. 20240231
+
+
+def event_from_properties(props):
+    # Inverse of serialize_event: "type: code" summary, notes from description
+    event_date = _iso_date(props.get("DTSTART", "")[:8])
+    if event_date is None:
+        return None
+    summary = unescape_text(props.get("SUMMARY", ""))
+    event_type, sep, project_code = summary.partition(SUMMARY_SEP)
+    if not sep:
+        event_type, project_code = summary, ""
+    return {
+        "date": event_date,
+        "event_type": event_type,
+        "project_code": project_code,
+        "notes": unescape_text(props.get("DESCRIPTION", "")),
+    }
+
+
+def iter_ics_events(file_path, progress=None, progress_every=CHUNK_EVENTS):
+    # Yields event dicts; cancelled VEVENTs (delta files) and events without
+    # a usable DTSTART are skipped. progress(bytes_read, bytes_total) is
+    # called every progress_every events.
+    total = os.path.getsize(file_path)
+    wanted = ("SUMMARY", "DTSTART", "DESCRIPTION", "STATUS")
+    count = 0
+    with open(file_path, "rb") as f:
+        props = None
+        nested = 0  # VALARM etc. inside the VEVENT: their properties are not the event's
+        for line, position in iter_unfolded_lines(f):
+            if props is None:
+                if line == "BEGIN:VEVENT":
+                    props = {}
+                continue
+            if line.startswith("BEGIN:"):
+                nested += 1
+                continue
+            if nested:
+                if line.startswith("END:"):
+                    nested -= 1
+                continue
+            if line == "END:VEVENT":
+                event = None
+                if props.get("STATUS", "").upper() != "CANCELLED":
+                    event = event_from_properties(props)
+                props = None
+                if event is not None:
+                    yield event
+                    count += 1
+                    if progress and count % progress_every == 0:
+                        progress(position, total)
+                continue
+            name, value = split_property(line)
+            if name in wanted:
+                props[name] = value
+    if progress:
+        progress(total, total)
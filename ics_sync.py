@@ -0,0 +1,184 @@
+"""Incremental .ics export.
+
+A sidecar index next to the calendar (<file>.sync.json) maps each UID to its
+SEQUENCE, a hash of its content and its date. A sync compares the current
+events against it: new UIDs start at SEQUENCE 0, changed events get their
+SEQUENCE bumped, and UIDs that disappeared are dropped. The calendar is
+rewritten with those sequences; optionally a delta calendar with only the
+added and changed events, plus STATUS:CANCELLED stubs for removed ones, is
+written for clients that should not re-import everything. Without a sidecar
+the previous .ics itself is scanned.
+"""
+import hashlib
+import json
+import os
+
+from atomicfile import atomic_write
+from ics import CHUNK_EVENTS, CRLF, DateFormatter, UidAssigner, serialize_event, write_vevents
+
+SIDECAR_SUFFIX = ".sync.json"
+
+
+class SyncStats:
+    def __init__(self):
+        self.added = 0
+        self.changed = 0
+        self.removed = 0
+        self.unchanged = 0
+
+    def __str__(self):
+        return (f"{self.added} added, {self.changed} changed, {self.removed} removed, "
+                f"{self.unchanged} unchanged")
+
+
+def sidecar_path(file_path):
+    return file_path + SIDECAR_SUFFIX
+
+
+def content_hash(vevent):
+    # Hash of the VEVENT as serialized without its SEQUENCE line
+    return hashlib.sha1(vevent.encode("utf-8")).hexdigest()[:16]
+
+
+def scan_ics(file_path):
+    # Rebuilds the index from a calendar this app wrote: UID -> [sequence,
+    # content hash, date]. Folded lines are kept as they are, so the hash
+    # matches what serialize_event produces for an unchanged event.
+    index = {}
+    block = None
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        for line in f:
+            if line.startswith("BEGIN:VEVENT"):
+                block = [line]
+                uid = ical_date = None
+                sequence = 0
+                continue
+            if block is None:
+                continue
+            if line.startswith("SEQUENCE:"):
+                try:
+                    sequence = int(line[9:].strip())
+                except ValueError:
+                    pass
+                continue
+            block.append(line)
+            if line.startswith("UID:"):
+                uid = line[4:].strip()
+            elif line.startswith("DTSTART"):
+                ical_date = line.rpartition(":")[2].strip()
+            elif line.startswith("END:VEVENT"):
+                if uid:
+                    index[uid] = [sequence, content_hash("".join(block)), ical_date]
+                block = None
+    return index
+
+
+def read_vevents(file_path, uids):
+    # {UID: VEVENT text as written} for the wanted UIDs of a calendar this
+    # app wrote; empty if the calendar cannot be read
+    wanted = set(uids)
+    found = {}
+    block = None
+    try:
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            for line in f:
+                if line.startswith("BEGIN:VEVENT"):
+                    block = [line]
+                    uid = None
+                    continue
+                if block is None:
+                    continue
+                block.append(line)
+                if line.startswith("UID:"):
+                    uid = line[4:].strip()
+                elif line.startswith("END:VEVENT"):
+                    if uid in wanted:
+                        found[uid] = "".join(block)
+                    block = None
+    except (OSError, ValueError):
+        return {}
+    return found
+
+
+def save_index(file_path, index):
+    with atomic_write(sidecar_path(file_path)) as f:
+        # dumps() takes the C encoder; dump() into a file does not
+        f.write(json.dumps(index, separators=(",", ":")))
+
+
+def load_index(file_path):
+    try:
+        with open(sidecar_path(file_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(file_path):
+        return scan_ics(file_path)
+    return {}
+
+
+def next_sequence(old, digest, stats):
+    # SEQUENCE for an event with content hash `digest`, given its previous
+    # index entry (or None); counts it as added, changed or unchanged
+    if old is None or old[1] is None:
+        stats.added += 1
+        return 0 if old is None else old[0] + 1
+    if old[1] != digest:
+        stats.changed += 1
+        return old[0] + 1
+    stats.unchanged += 1
+    return old[0]
+
+
+def cancel_stub(uid, sequence, ical_date):
+    lines = ["BEGIN:VEVENT", f"UID:{uid}", f"SEQUENCE:{sequence}"]
+    if ical_date:
+        lines.append(f"DTSTART;VALUE=DATE:{ical_date}")
+    lines.extend(["STATUS:CANCELLED", "END:VEVENT"])
+    return CRLF.join(lines) + CRLF
+
+
+def sync_ics(events, file_path, delta_path=None, chunk_events=CHUNK_EVENTS, progress=None):
+    # Returns SyncStats. Removed UIDs stay in the sidecar as tombstones
+    # (hash None) so an event that comes back continues its old SEQUENCE
+    # instead of restarting below the cancellation clients have seen.
+    previous = load_index(file_path)
+    index = {}
+    delta = []
+    stats = SyncStats()
+
+    def vevents():
+        format_date = DateFormatter()
+        assign_uid = UidAssigner()
+        for event in events:
+            ical_date = format_date(event)
+            if ical_date is None:
+                continue
+            uid = assign_uid(event)
+            extra = [f"UID:{uid}"]
+            vevent = serialize_event(event, ical_date, extra)
+            digest = content_hash(vevent)
+            old = previous.get(uid)
+            sequence = next_sequence(old, digest, stats)
+            if sequence:
+                vevent = serialize_event(event, ical_date, extra + [f"SEQUENCE:{sequence}"])
+            if delta_path and (old is None or old[1] != digest):
+                delta.append(vevent)
+            index[uid] = [sequence, digest, ical_date]
+            yield vevent
+
+    write_vevents(vevents(), file_path, chunk_events, progress)
+    for uid, (sequence, digest, ical_date) in previous.items():
+        if uid in index:
+            continue
+        if digest is None:
+            index[uid] = [sequence, None, ical_date]  # already cancelled earlier
+            continue
+        stats.removed += 1
+        index[uid] = [sequence + 1, None, ical_date]
+        if delta_path:
+            delta.append(cancel_stub(uid, sequence + 1, ical_date))
+    if delta_path:
+        write_vevents(delta, delta_path, chunk_events)
+    save_index(file_path, index)
+    return stats
@@ -0,0 +1,203 @@
+"""Logging, per-stage timers and counters, and opt-in profiling.
+
+Stages are timed with `with stage("pdf.extract_tables", page=3): ...` and
+hot loops report aggregated time through add_time(); counters go through
+count(). Recording is off by default and then costs one attribute check per
+call. Once enabled, results can be saved as JSON (per-stage totals plus
+every span) or as a Chrome trace (chrome://tracing, Perfetto) to see which
+stage is slow for a given file.
+
+Stage names used by the pipeline:
+
+    file.parse          one input file (CLI)
+    xlsm.open           load_workbook
+    xlsm.row_scan       pulling rows out of the sheet
+    pdf.open            pdfplumber.open, per page range
+    pdf.page_digests    per-page content hashes (cached runs only)
+    pdf.prescan         header/date check on the page text
+    pdf.extract_tables  table detection on one page
+    pdf.pool_wait       waiting on worker processes
+    rows.find_date_column, rows.date_parse, rows.event_build
+    ics.export          a whole .ics write; minus ics.file_write it is
+                        the VEVENT serialization
+    gui.refresh, gui.filter, gui.sort, tree.render
+
+Pages extracted in pool workers are not recorded one by one (each worker has
+its own, disabled recorder); pdf.pool_wait covers them as a whole.
+
+capture() adds cProfile and/or tracemalloc around a block and writes their
+reports next to the trace.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LOGGER_NAME = "ical_extractor"
+LOG_ENV = "ICAL_EXTRACTOR_LOG"
+PROFILE_ENV = "ICAL_EXTRACTOR_PROFILE"
+TRACEMALLOC_TOP = 25
+
+log = logging.getLogger(LOGGER_NAME)
+
+
+def setup_logging(level=None):
+    # level: name like "debug", or None for $ICAL_EXTRACTOR_LOG / warning
+    level = (level or os.environ.get(LOG_ENV) or "warning").upper()
+    logging.basicConfig(format="%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+    log.setLevel(getattr(logging, level, logging.WARNING))
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Recorder:
+    def __init__(self):
+        self.enabled = False
+        self.spans = []  # (name, start_s, duration_s, thread_id, args)
+        self.counters = {}
+        self._totals = {}  # name -> [calls, total_s, max_s], incl. add_time()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self.counters = {}
+            self._totals = {}
+            self._origin = time.perf_counter()
+
+    def stage(self, name, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.spans.append((name, start - self._origin, duration, threading.get_ident(), args))
+                self._add(name, duration)
+
+    def _add(self, name, seconds, calls=1):
+        totals = self._totals.get(name)
+        if totals is None:
+            totals = self._totals[name] = [0, 0.0, 0.0]
+        totals[0] += calls
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+    def add_time(self, name, seconds, calls=1):
+        # Aggregated time for work too fine-grained for one span per call
+        if self.enabled:
+            with self._lock:
+                self._add(name, seconds, calls)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        return {
+            "stages": {
+                name: {"calls": calls, "total_ms": round(total * 1000, 3), "max_ms": round(longest * 1000, 3)}
+                for name, (calls, total, longest) in sorted(self._totals.items(), key=lambda kv: -kv[1][1])
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def save_json(self, file_path):
+        data = self.summary()
+        data["spans"] = [
+            {"name": name, "start_ms": round(start * 1000, 3), "duration_ms": round(duration * 1000, 3),
+             "thread": tid, "args": args}
+            for name, start, duration, tid, args in self.spans
+        ]
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, default=str)
+
+    def save_chrome_trace(self, file_path):
+        pid = os.getpid()
+        events = [
+            {"name": name, "cat": name.partition(".")[0], "ph": "X", "ts": round(start * 1e6, 1),
+             "dur": round(duration * 1e6, 1), "pid": pid, "tid": tid, "args": args}
+            for name, start, duration, tid, args in self.spans
+        ]
+        end = max((start + duration for _n, start, duration, _t, _a in self.spans), default=0.0)
+        for name, value in self.counters.items():
+            events.append({"name": name, "ph": "C", "ts": round(end * 1e6, 1), "pid": pid, "args": {"count": value}})
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def save(self, directory, prefix="trace"):
+        # Writes <prefix>.json and <prefix>.trace.json; returns their paths
+        os.makedirs(directory, exist_ok=True)
+        paths = (os.path.join(directory, prefix + ".json"), os.path.join(directory, prefix + ".trace.json"))
+        self.save_json(paths[0])
+        self.save_chrome_trace(paths[1])
+        return paths
+
+
+recorder = Recorder()
+stage = recorder.stage
+add_time = recorder.add_time
+count = recorder.count
+
+
+@contextmanager
+def capture(directory, cprofile=True, memory=True, prefix="profile"):
+    # Enables the recorder and profiles the block; writes the stage trace,
+    # <prefix>.prof (pstats) and <prefix>.memory.txt (top allocations)
+    import tracemalloc
+    profiler = None
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+    recorder.reset()
+    recorder.enable()
+    if memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield recorder
+    finally:
+        if profiler:
+            profiler.disable()
+        snapshot = None
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        recorder.disable()
+        os.makedirs(directory, exist_ok=True)
+        recorder.save(directory, prefix)
+        if profiler:
+            profiler.dump_stats(os.path.join(directory, prefix + ".prof"))
+        if snapshot is not None:
+            with open(os.path.join(directory, prefix + ".memory.txt"), "w", encoding="utf-8") as f:
+                f.write(f"peak traced: {peak / 1024 / 1024:.1f} MiB\n")
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+        log.info("profile written to %s", directory)
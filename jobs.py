@@ -0,0 +1,125 @@
+"""Background jobs for the Tk app.
+
+Work runs on a worker thread and talks to the GUI only through a queue that
+the Tk event loop drains with after(), so no Tk call ever happens off the
+main thread. Jobs report progress, hand over partial results and can be
+cancelled; the work function sees a cancel as JobCancelled raised from its
+next progress()/emit() call.
+"""
+import queue
+import threading
+
+POLL_MS = 50
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self):
+        self._cancel = threading.Event()
+        self._queue = queue.Queue()
+        self.thread = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, *args):
+        self.check()
+        self._queue.put(("progress", args))
+
+    def emit(self, items):
+        self.check()
+        self._queue.put(("chunk", items))
+
+
+class JobRunner:
+    # One job at a time; callers guard their buttons on `busy`
+    def __init__(self, widget, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.current = None
+
+    @property
+    def busy(self):
+        return self.current is not None
+
+    def start(self, work, on_chunk=None, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+        if self.busy:
+            raise RuntimeError("Another job is still running.")
+        job = Job()
+        handlers = {
+            "chunk": on_chunk,
+            "progress": on_progress,
+            "done": on_done,
+            "error": on_error,
+            "cancelled": on_cancel,
+        }
+
+        def run():
+            try:
+                result = work(job)
+            except JobCancelled:
+                job._queue.put(("cancelled", ()))
+            except Exception as e:
+                job._queue.put(("error", (e,)))
+            else:
+                job._queue.put(("done", (result,)))
+
+        job.thread = threading.Thread(target=run, name="ical-job", daemon=True)
+        self.current = job
+        job.thread.start()
+        self.widget.after(self.poll_ms, self._poll, job, handlers)
+        return job
+
+    def cancel(self):
+        if self.current is not None:
+            self.current.cancel()
+
+    def _poll(self, job, handlers):
+        # Chunks queued since the last poll are handed over as one batch and
+        # only the latest progress is shown, so a fast worker cannot flood
+        # the event loop
+        chunk = []
+        progress = None
+        final = None
+        while True:
+            try:
+                kind, payload = job._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "chunk":
+                chunk.extend(payload)
+            elif kind == "progress":
+                progress = payload
+            else:
+                final = (kind, payload)
+                break
+        try:
+            if chunk and handlers["chunk"]:
+                handlers["chunk"](chunk)
+            if progress is not None and handlers["progress"] and final is None:
+                handlers["progress"](*progress)
+        except Exception as e:
+            # A failing handler ends the job like a failing worker, instead of
+            # leaving it busy forever with nobody polling
+            job.cancel()
+            final = ("error", (e,))
+        if final is None:
+            self.widget.after(self.poll_ms, self._poll, job, handlers)
+            return
+        # Cleared before the final handler runs, so neither an exception from
+        # it nor a follow-up job it starts can find the runner still busy
+        self.current = None
+        kind, payload = final
+        if handlers[kind]:
+            handlers[kind](*payload)
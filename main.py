@@ -1,28 +1,71 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog
 import os
-from openpyxl import load_workbook
-from datetime import datetime
-from icalendar import Calendar, Event
-from ttkthemes import ThemedTk
-
-class EventExtractorApp(ThemedTk):
+import multiprocessing
+import threading
+import extractor
+import dates
+import instrument
+from instrument import log
+from virtual_tree import VirtualTreeview
+from search import SearchIndex
+from event_store import EventStore
+from jobs import JobRunner
+from cache import ParseCache
+from merge import EventMerger, event_key, iter_merged_events
+from sorting import SortIndex
+# openpyxl, pdfplumber and ttkthemes (which pulls in PIL) are imported on
+# first use, so the window is up before they have loaded; preload_parsers()
+# then warms the parsers up in the background.
+
+COLUMNS = ("date", "event_type", "project_code", "notes")
+SEARCH_DEBOUNCE_MS = 150
+# Events handed from the import thread to the table per batch
+IMPORT_BATCH = 2000
+# Themes shipped with Tk itself; the others come from ttkthemes
+BUILTIN_THEMES = ("alt", "clam", "default", "classic")
+EXTRA_THEMES = (
+    "arc", "plastik", "clearlooks", "radiance", "scidgrey", "scidgreen", "scidmint", "scidblue", "scidpurple",
+    "scidpink", "black", "breeze", "equilux", "keramik", "winxpblue", "yaru", "adapta",
+)
+DEFAULT_THEME = "clam"  # good Treeview visibility on every platform
+
+class EventExtractorApp(tk.Tk):
     def __init__(self):
-        super().__init__(theme="adapta")
+        super().__init__()
         self.title("iCal Event Extractor")
         self.geometry("700x500")
         self.minsize(500, 300)
-        self.events = []
+        self.store = EventStore()
+        self.search_index = SearchIndex()
+        self.sort_index = SortIndex(self.store)
+        self._search_job = None
+        self._import_start_count = 0
+        self.jobs = JobRunner(self)
+        try:
+            self.cache = ParseCache()
+        except OSError:
+            self.cache = None  # read-only home etc.: parse without caching
+        self._themed_style = None
         self.create_menu()
         self.create_widgets()
         self.create_status_bar()
+        self.after_idle(self.preload_parsers)
+
+    def preload_parsers(self):
+        # Once the window is drawn, import the parser stack on a daemon
+        # thread so the first import does not wait for it. Importing on the
+        # Tk thread later just waits for the module lock if it is still busy.
+        def load():
+            with instrument.stage("gui.preload_parsers"):
+                import openpyxl  # noqa: F401
+                import pdfplumber  # noqa: F401
+        threading.Thread(target=load, name="preload-parsers", daemon=True).start()
 
     def create_menu(self):
         menubar = tk.Menu(self)
         theme_menu = tk.Menu(menubar, tearoff=0)
-        self.available_themes = [
-            "arc", "plastik", "clearlooks", "radiance", "scidgrey", "scidgreen", "scidmint", "scidblue", "scidpurple", "scidpink", "scidgrey", "black", "breeze", "equilux", "keramik", "winxpblue", "yaru", "adapta", "alt", "clam", "default", "classic"
-        ]
+        self.available_themes = list(EXTRA_THEMES + BUILTIN_THEMES)
         for theme in self.available_themes:
             theme_menu.add_command(label=theme, command=lambda t=theme: self.apply_theme(t))
         menubar.add_cascade(label="Theme", menu=theme_menu)
@@ -30,35 +73,52 @@ class EventExtractorApp(ThemedTk):
 
     def apply_theme(self, theme_name):
         try:
-            super().set_theme(theme_name)
+            if theme_name in BUILTIN_THEMES:
+                ttk.Style().theme_use(theme_name)
+            else:
+                if self._themed_style is None:
+                    from ttkthemes import ThemedStyle  # loads the theme packages on first use
+                    self._themed_style = ThemedStyle(self)
+                self._themed_style.set_theme(theme_name)
         except Exception as e:
             messagebox.showerror("Theme Error", f"Could not set theme '{theme_name}': {e}")
+            return
+        # Style settings are per theme
+        self.configure_styles()
+
+    def configure_styles(self):
+        style = ttk.Style()
+        style.configure("Treeview", font=("Segoe UI", 11), rowheight=28, borderwidth=2, relief="groove")
+        style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
+        style.map("Treeview", background=[('selected', '#3399FF')])
 
     def create_widgets(self):
         # Main frame for layout
         main_frame = tk.Frame(self)
         main_frame.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
 
-        # Set ttk theme to 'clam' for better cross-platform Treeview visibility
-        style = ttk.Style()
         try:
-            style.theme_use('clam')
-        except Exception:
+            ttk.Style().theme_use(DEFAULT_THEME)
+        except tk.TclError:
             pass  # fallback to default if 'clam' is not available
-        style.configure("Treeview", rowheight=24, borderwidth=2, relief="groove")
-        style.configure("Treeview.Heading", font=(None, 10, "bold"))
-        style.map("Treeview", background=[('selected', '#ececec')])
-
-        # Import button
-        self.import_btn = tk.Button(main_frame, text="Import XLSM or PDF", command=self.import_file)
-        self.import_btn.pack(pady=(0, 10), anchor="w")
+        self.configure_styles()
+
+        # Import button, plus Cancel for a running import/export
+        button_frame = tk.Frame(main_frame)
+        button_frame.pack(pady=(0, 10), anchor="w")
+        self.import_btn = tk.Button(button_frame, text="Import XLSM, PDF or ICS", command=self.import_file)
+        self.import_btn.pack(side=tk.LEFT)
+        self.merge_btn = tk.Button(button_frame, text="Merge files...", command=self.merge_files)
+        self.merge_btn.pack(side=tk.LEFT, padx=(5, 0))
+        self.cancel_btn = tk.Button(button_frame, text="Cancel", command=self.jobs.cancel, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(5, 0))
 
         # Search/filter bar
         search_frame = tk.Frame(main_frame)
         search_frame.pack(fill=tk.X, pady=(0, 5))
         tk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
         self.search_var = tk.StringVar()
-        self.search_var.trace_add('write', lambda *args: self.refresh_tree())
+        self.search_var.trace_add('write', lambda *args: self.schedule_search())
         self.search_entry = tk.Entry(search_frame, textvariable=self.search_var)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
 
@@ -66,29 +126,23 @@ class EventExtractorApp(ThemedTk):
         self.table_label = tk.Label(main_frame, text="Extracted Events:")
         self.table_label.pack(anchor="w")
 
-        # Treeview with vertical scrollbar
-        columns = ("date", "event_type", "project_code", "notes")
-        tree_frame = tk.Frame(main_frame)
-        tree_frame.pack(expand=True, fill=tk.BOTH)
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="extended")
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
-        tree_frame.rowconfigure(0, weight=1)
-        tree_frame.columnconfigure(0, weight=1)
-        # Modern font and row height
-        style = ttk.Style()
-        style.configure("Treeview", font=("Segoe UI", 11), rowheight=28)
-        style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
+        # Virtualized Treeview: only the visible rows exist as Tk items
+        columns = COLUMNS
+        self.table = VirtualTreeview(main_frame, columns, self.event_values)
+        self.table.frame.pack(expand=True, fill=tk.BOTH)
+        self.tree = self.table.tree
+        # [(column, reverse), ...]: click a heading to sort by it (again to
+        # reverse), Shift+click to add it as a further sort column
+        self.sort_spec = []
+        self._heading_shift = False
         # Alternating row colors
-        style.map("Treeview", background=[('selected', '#3399FF')])
         self.tree.tag_configure('oddrow', background='#f5f5f5')
         self.tree.tag_configure('evenrow', background='#e0e0e0')
         # Resizable columns (default in ttk, but set minwidth for usability)
         for i, col in enumerate(columns):
-            self.tree.heading(col, text=col.capitalize(), command=lambda c=col: self.sort_by_column(c, False))
+            self.tree.heading(col, text=col.capitalize(), command=lambda c=col: self.sort_by_column(c))
             self.tree.column(col, width=150, minwidth=80, stretch=True)
+        self.tree.bind("<Button-1>", self.on_tree_press, add="+")
         self.tree.bind("<Double-1>", self.on_tree_double_click)
         self.tree.bind("<Button-3>", self.on_tree_right_click)
         self.tree.bind("<Button-2>", self.on_tree_right_click)
@@ -111,9 +165,22 @@ class EventExtractorApp(ThemedTk):
         else:
             self.status_bar.config(fg="black")
 
+    def set_busy(self, busy):
+        # Guard import/export while a background job runs
+        self.import_btn.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.merge_btn.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if busy else tk.DISABLED)
+        if busy or not self.store:
+            self.export_btn.config(state=tk.DISABLED)
+        else:
+            self.export_btn.config(state=tk.NORMAL)
+
     def import_file(self):
+        if self.jobs.busy:
+            return
         file_path = filedialog.askopenfilename(
-            filetypes=[("Excel Macro-Enabled Workbook", "*.xlsm"), ("PDF Files", "*.pdf")]
+            filetypes=[("Excel Macro-Enabled Workbook", "*.xlsm"), ("PDF Files", "*.pdf"),
+                       ("iCal files", "*.ics")]
         )
         if not file_path:
             return
@@ -122,173 +189,170 @@ class EventExtractorApp(ThemedTk):
             self.parse_xlsm(file_path)
         elif ext == ".pdf":
             self.parse_pdf(file_path)
+        elif ext == ".ics":
+            self.parse_ics(file_path)
         else:
-            messagebox.showerror("Invalid file", "Please select an XLSM or PDF file.")
+            messagebox.showerror("Invalid file", "Please select an XLSM, PDF or ICS file.")
 
     def parse_xlsm(self, file_path):
-        try:
-            wb = load_workbook(file_path, data_only=True)
-            ws = wb.active
-            headers = [cell.value for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-            # Only treat these as event columns
-            allowed_event_columns = {"Zustellung zu CCR", "CCR", "Zustellung zu ITV"}
-            event_columns = []  # List of (index, column_name)
-            for i, h in enumerate(headers):
-                if h and str(h).strip() in allowed_event_columns:
-                    event_columns.append((i, str(h).strip()))
-            events = []
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                # Find the first datetime value in the row as the date
-                date_val = None
-                for cell in row:
-                    if isinstance(cell, datetime):
-                        date_val = cell
-                        break
-                if not date_val:
-                    continue  # Skip if no valid date found
-                date_str = date_val.strftime("%Y-%m-%d")
-                # For each allowed event column that is non-empty, create an event
-                for idx, col_name in event_columns:
-                    project_code = row[idx]
-                    if project_code and str(project_code).strip():
-                        events.append({
-                            "date": date_str,
-                            "event_type": col_name,
-                            "project_code": str(project_code).strip(),
-                            "notes": ""
-                        })
-            self.events = events
-            print(f"[DEBUG] Parsed {len(self.events)} events.")
-            self.refresh_tree()
-            if self.events:
-                self.export_btn.config(state=tk.NORMAL)
-            else:
-                self.export_btn.config(state=tk.DISABLED)
-            self.set_status(f"Imported {len(self.events)} events from XLSM.")
-        except Exception as e:
-            self.set_status(f"Failed to parse XLSM: {e}", error=True)
-            messagebox.showerror("Error", f"Failed to parse XLSM: {e}")
+        self.start_import("XLSM", lambda job: extractor.iter_xlsm_events(file_path, cache=self.cache))
 
     def parse_pdf(self, file_path):
-        try:
-            import pdfplumber
-            with pdfplumber.open(file_path) as pdf:
-                # Try to find the first page with a table
-                table = None
-                for page in pdf.pages:
-                    tables = page.extract_tables()
-                    if tables:
-                        table = tables[0]
-                        break
-                if not table:
-                    self.set_status("No table found in PDF.", error=True)
-                    messagebox.showerror("Error", "No table found in PDF.")
-                    return
-                headers = table[0]
-                # Normalize header names (remove whitespace and line breaks)
-                def norm_header(h):
-                    if not h:
-                        return None
-                    return ' '.join(str(h).replace('\n', ' ').split())
-                norm_headers = [norm_header(h) for h in headers]
-                allowed_event_columns = {"Zustellung zu CCR", "CCR", "Zustellung zu ITV"}
-                event_columns = []
-                for i, h in enumerate(norm_headers):
-                    if h and h in allowed_event_columns:
-                        event_columns.append((i, h))
-                events = []
-                for row in table[1:]:
-                    # Find the first cell that looks like a date (YYYY-MM-DD or DD.MM.YYYY)
-                    date_val = None
-                    for cell in row:
-                        if cell:
-                            cell_str = cell.strip()
-                            for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
-                                try:
-                                    date_val = datetime.strptime(cell_str, fmt)
-                                    break
-                                except Exception:
-                                    continue
-                            if date_val:
-                                break
-                    if not date_val:
-                        continue
-                    date_str = date_val.strftime("%Y-%m-%d")
-                    for idx, col_name in event_columns:
-                        if idx < len(row):
-                            project_code = row[idx]
-                            if project_code and str(project_code).strip():
-                                events.append({
-                                    "date": date_str,
-                                    "event_type": col_name,
-                                    "project_code": str(project_code).strip(),
-                                    "notes": ""
-                                })
-                self.events = events
-                self.refresh_tree()
-                if self.events:
-                    self.export_btn.config(state=tk.NORMAL)
-                else:
-                    self.export_btn.config(state=tk.DISABLED)
-                self.set_status(f"Imported {len(self.events)} events from PDF.")
-        except Exception as e:
-            self.set_status(f"Failed to parse PDF: {e}", error=True)
-            messagebox.showerror("Error", f"Failed to parse PDF: {e}")
+        def pdf_progress(done, total):
+            self.set_status(f"Importing PDF: page {done} of {total}, {len(self.store)} events so far...")
+        self.start_import("PDF", lambda job: extractor.iter_pdf_events(
+            file_path, progress=job.progress, cache=self.cache), on_progress=pdf_progress)
+
+    def parse_ics(self, file_path):
+        # Reloads an exported calendar for editing and re-export
+        def ics_progress(done, total):
+            self.set_status(f"Importing ICS: {100 * done // max(total, 1)}%, {len(self.store)} events so far...")
+        self.start_import("ICS", lambda job: extractor.iter_ics_events(file_path, progress=job.progress),
+                          on_progress=ics_progress)
+
+    def merge_files(self):
+        # Adds events from many files (every sheet and table) to the current
+        # set, skipping any event whose date, type and code are already there
+        if self.jobs.busy:
+            return
+        file_paths = filedialog.askopenfilenames(
+            filetypes=[("Schedules", "*.xlsm *.pdf *.ics"), ("Excel Macro-Enabled Workbook", "*.xlsm"),
+                       ("PDF Files", "*.pdf"), ("iCal files", "*.ics")]
+        )
+        if not file_paths:
+            return
+        merger = EventMerger(event_key(record) for record in self.store)
 
-    def refresh_tree(self):
-        print(f"[DEBUG] refresh_tree called. Number of events: {len(self.events)}")
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        # Filter events based on search
-        search = getattr(self, 'search_var', None)
-        if search:
-            search_text = self.search_var.get().strip().lower()
-        else:
-            search_text = ''
-        filtered_events = []
-        if search_text:
-            for event in self.events:
-                if (search_text in event["date"].lower() or
-                    search_text in event["event_type"].lower() or
-                    search_text in event["project_code"].lower() or
-                    search_text in event["notes"].lower()):
-                    filtered_events.append(event)
+        def merge_progress(done, total):
+            self.set_status(f"Merging: file {done} of {total}, {merger.added} new events so far...")
+
+        def iter_events(job):
+            for events in iter_merged_events(file_paths, merger, cache=self.cache, progress=job.progress):
+                yield from events
+
+        self.start_import("files", iter_events, on_progress=merge_progress, replace=False,
+                          summary=merger.summary)
+
+    def start_import(self, kind, iter_events, on_progress=None, replace=True, summary=None):
+        # Parsing runs on a worker thread; events arrive in batches through
+        # on_import_chunk on the Tk thread and show up while the file is read.
+        # replace=False adds to the loaded events instead of starting over.
+        if replace:
+            self.store = EventStore()
+            self.reindex()
+            self.refresh_tree()
+        self._import_start_count = len(self.store)
+        self.set_busy(True)
+        self.set_status(f"Importing {kind}...")
+        if self.cache is not None:
+            self.cache.reset_stats()
+
+        def work(job):
+            batch = []
+            try:
+                for event in iter_events(job):
+                    batch.append(event)
+                    if len(batch) >= IMPORT_BATCH:
+                        job.emit(batch)
+                        batch = []
+            finally:
+                if self.cache is not None:
+                    self.cache.save_index()
+            if batch:
+                job.emit(batch)
+
+        self.jobs.start(
+            work,
+            on_chunk=lambda events: self.on_import_chunk(kind, events),
+            on_progress=on_progress,
+            on_done=lambda result: self.finish_import(kind, summary=summary),
+            on_error=lambda e: self.import_failed(kind, e),
+            on_cancel=lambda: self.finish_import(kind, cancelled=True, summary=summary),
+        )
+
+    def on_import_chunk(self, kind, events):
+        ids = self.store.extend(events)
+        self.search_index.add_many((event_id, self.store[event_id]) for event_id in ids)
+        self.refresh_tree()
+        self.set_status(f"Importing {kind}: {len(self.store)} events so far...")
+
+    def finish_import(self, kind, cancelled=False, summary=None):
+        log.debug("%s import done: %d events in the table", kind, len(self.store))
+        self.set_busy(False)
+        added = len(self.store) - self._import_start_count
+        if cancelled:
+            message = f"Import cancelled after {added} events from {kind}."
         else:
-            filtered_events = self.events
-        if not filtered_events:
-            self.tree.insert("", tk.END, iid=0, values=("No events loaded", "", "", ""))
-            self.tree.item(0, tags=("placeholder",))
-            self.tree.tag_configure("placeholder", foreground="#888888")
+            message = f"Imported {added} events from {kind}."
+        details = [summary()] if summary else []
+        if self.cache is not None:
+            details.append(self.cache.stats_text())
+        if details:
+            message = f"{message[:-1]} ({'; '.join(details)})."
+        self.set_status(message)
+
+    def import_failed(self, kind, e):
+        self.set_busy(False)
+        if isinstance(e, extractor.NoTableFoundError):
+            message = str(e)
         else:
-            for idx, event in enumerate(filtered_events):
-                tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-                self.tree.insert("", tk.END, iid=idx, values=(event["date"], event["event_type"], event["project_code"], event["notes"]), tags=(tag,))
+            message = f"Failed to parse {kind}: {e}"
+        self.set_status(message, error=True)
+        messagebox.showerror("Error", message)
+
+    def event_values(self, event_id):
+        return self.store[event_id].values()
+
+    def reindex(self):
+        # Rows are keyed by their stable event ID
+        self.search_index = SearchIndex(self.store.items())
+        self.sort_index = SortIndex(self.store)
+
+    def schedule_search(self):
+        # Debounce typing: filter once the user pauses instead of per keystroke
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self._search_job = None
+        self.refresh_tree()
+
+    def refresh_tree(self):
+        log.debug("refresh_tree: %d events", len(self.store))
+        # Filter events based on search (see search.py for the query syntax)
+        search = getattr(self, 'search_var', None)
+        search_text = search.get() if search else ''
+        with instrument.stage("gui.refresh", events=len(self.store)):
+            with instrument.stage("gui.filter"):
+                rows = self.search_index.filter(search_text)
+            # Typed sort on the model (see sorting.py); only the result is rendered
+            with instrument.stage("gui.sort", rows=len(rows)):
+                self.sort_index.sort(rows, self.sort_spec)
+            self.table.set_rows(rows)
 
     def on_tree_double_click(self, event):
-        item_id = self.tree.focus()
-        if not item_id:
+        event_id = self.table.identify_key(event.y)
+        if event_id is None:
             return
-        idx = int(item_id)
-        event_data = self.events[idx]
+        event_data = self.store[event_id].as_dict()
         # Identify which column was clicked
         region = self.tree.identify("region", event.x, event.y)
         col = self.tree.identify_column(event.x)
         col_num = int(col.replace('#', '')) - 1  # columns are 1-indexed
-        columns = ("date", "event_type", "project_code", "notes")
-        if region == "cell" and columns[col_num] == "notes":
+        if region == "cell" and COLUMNS[col_num] == "notes":
             # Inline edit for notes
-            self.inline_edit_notes(idx)
+            self.inline_edit_notes(event_id)
         else:
             # Popup edit for all fields
-            EditEventDialog(self, event_data, lambda updated_event: self.update_event(idx, updated_event))
+            EditEventDialog(self, event_data, lambda updated_event: self.update_event(event_id, updated_event))
 
     def on_tree_right_click(self, event):
         # Select the row under the cursor if not already selected
-        row_id = self.tree.identify_row(event.y)
-        if row_id:
-            if row_id not in self.tree.selection():
-                self.tree.selection_set(row_id)
-        selected = self.tree.selection()
+        row_key = self.table.identify_key(event.y)
+        if row_key is not None:
+            self.table.select_key(row_key)
+        selected = self.table.selection()
         if not selected:
             return
         menu = tk.Menu(self, tearoff=0)
@@ -299,46 +363,49 @@ class EventExtractorApp(ThemedTk):
         menu.add_command(label="Bulk Delete", command=self.bulk_delete_events)
         menu.tk_popup(event.x_root, event.y_root)
 
-    def edit_selected_event(self, iid):
-        idx = int(iid)
-        event_data = self.events[idx]
-        EditEventDialog(self, event_data, lambda updated_event: self.update_event(idx, updated_event))
+    def edit_selected_event(self, event_id):
+        event_data = self.store[event_id].as_dict()
+        EditEventDialog(self, event_data, lambda updated_event: self.update_event(event_id, updated_event))
 
-    def delete_selected_event(self, iid):
-        idx = int(iid)
-        del self.events[idx]
-        self.refresh_tree()
+    def delete_events(self, event_ids):
+        # Batched: store, search index and table each drop the IDs in one
+        # linear pass, and the current filter and sort order stay as they are
+        removed = self.store.remove_many(event_ids)
+        self.search_index.remove_many(event_ids)
+        self.table.remove_rows(event_ids)
+        return removed
+
+    def delete_selected_event(self, event_id):
+        self.delete_events([event_id])
         self.set_status("Event deleted.")
 
     def bulk_delete_events(self):
-        selected = self.tree.selection()
+        selected = self.table.selection()
         if not selected:
             self.set_status("No events selected for bulk delete.", error=True)
             return
-        idxs = sorted([int(iid) for iid in selected], reverse=True)
-        for idx in idxs:
-            del self.events[idx]
-        self.refresh_tree()
-        self.set_status(f"Deleted {len(idxs)} events.")
+        removed = self.delete_events(selected)
+        self.set_status(f"Deleted {removed} events.")
 
     def bulk_edit_notes(self):
-        selected = self.tree.selection()
+        selected = self.table.selection()
         if not selected:
             self.set_status("No events selected for bulk edit.", error=True)
             return
-        idxs = [int(iid) for iid in selected]
         # Prompt for new note
-        new_note = simpledialog.askstring("Bulk Edit Notes", f"Enter new note for {len(idxs)} selected events:")
+        new_note = simpledialog.askstring("Bulk Edit Notes", f"Enter new note for {len(selected)} selected events:")
         if new_note is not None:
-            for idx in idxs:
-                self.events[idx]["notes"] = new_note
-            self.refresh_tree()
-            self.set_status(f"Updated notes for {len(idxs)} events.")
-
-    def inline_edit_notes(self, idx):
-        item_id = str(idx)
+            self.store.set_notes_many(selected, new_note)
+            self.search_index.update_many((event_id, self.store[event_id]) for event_id in selected)
+            self.table.render()
+            self.set_status(f"Updated notes for {len(selected)} events.")
+
+    def inline_edit_notes(self, event_id):
+        item_id = self.table.item_for_key(event_id)
+        if item_id is None:
+            return
         x, y, width, height = self.tree.bbox(item_id, 3)  # 3 = notes column (0-based)
-        value = self.events[idx]["notes"]
+        value = self.store[event_id].notes
         entry = tk.Entry(self.tree)
         entry.insert(0, value)
         entry.select_range(0, tk.END)
@@ -347,20 +414,24 @@ class EventExtractorApp(ThemedTk):
 
         def save_edit(event=None):
             new_val = entry.get()
-            self.events[idx]["notes"] = new_val
+            self.store.set_notes(event_id, new_val)
             entry.destroy()
-            self.refresh_tree()
-            self.set_status(f"Note updated for event on {self.events[idx]['date']}.")
+            self.search_index.update(event_id, self.store[event_id])
+            self.table.update_row(event_id)
+            self.set_status(f"Note updated for event on {self.store[event_id].date}.")
 
         entry.bind("<Return>", save_edit)
         entry.bind("<FocusOut>", lambda e: save_edit())
 
-    def update_event(self, idx, updated_event):
-        self.events[idx] = updated_event
-        self.refresh_tree()
+    def update_event(self, event_id, updated_event):
+        record = self.store.update(event_id, updated_event)
+        self.search_index.update(event_id, record)
+        self.table.update_row(event_id)
 
     def export_ics(self):
-        if not self.events:
+        if self.jobs.busy:
+            return
+        if not self.store:
             self.set_status("There are no events to export.", error=True)
             messagebox.showwarning("No Events", "There are no events to export.")
             return
@@ -372,46 +443,69 @@ class EventExtractorApp(ThemedTk):
         if not file_path:
             self.set_status("Export cancelled.")
             return
-        try:
-            cal = Calendar()
-            cal.add('prodid', '-//iCal Event Extractor//mxm.dk//')
-            cal.add('version', '2.0')
-            for event in self.events:
-                try:
-                    event_date = datetime.strptime(event['date'], "%Y-%m-%d").date()
-                except Exception:
-                    continue  # Skip events with invalid dates
-                ical_event = Event()
-                ical_event.add('summary', f"{event['event_type']}: {event['project_code']}")
-                ical_event.add('dtstart', event_date)
-                ical_event.add('dtend', event_date)
-                ical_event.add('description', event['notes'])
-                ical_event.add('transp', 'TRANSPARENT')
-                ical_event.add('X-MICROSOFT-CDO-ALLDAYEVENT', 'TRUE')
-                cal.add_component(ical_event)
-            with open(file_path, 'wb') as f:
-                f.write(cal.to_ical())
-            self.set_status(f"ICS file saved to: {file_path}")
+        # Snapshot the field values: records are edited in place, so copying
+        # only the references would let the worker thread serialize an event
+        # halfway through an edit
+        records = [record.as_dict() for record in self.store]
+        total = len(records)
+
+        def export_progress(written):
+            self.set_status(f"Exporting: {written} of {total} events...")
+
+        def export_done(stats):
+            self.set_busy(False)
+            self.set_status(f"ICS file saved to: {file_path} ({stats})")
             messagebox.showinfo("Export Successful", f"ICS file saved to: {file_path}")
-        except Exception as e:
+
+        def export_failed(e):
+            self.set_busy(False)
             self.set_status(f"Failed to export ICS: {e}", error=True)
             messagebox.showerror("Export Failed", f"Failed to export ICS: {e}")
 
-    def sort_by_column(self, col, reverse):
-        # Get column index
-        columns = ("date", "event_type", "project_code", "notes")
-        col_idx = columns.index(col)
-        # Get all items and sort
-        data = [(self.tree.set(k, col), k) for k in self.tree.get_children("")]
-        try:
-            data.sort(key=lambda t: t[0], reverse=reverse)
-        except Exception:
-            data.sort(key=lambda t: str(t[0]), reverse=reverse)
-        # Rearrange items in sorted positions
-        for index, (val, k) in enumerate(data):
-            self.tree.move(k, '', index)
-        # Reverse sort next time
-        self.tree.heading(col, command=lambda: self.sort_by_column(col, not reverse))
+        def export_cancelled():
+            self.set_busy(False)
+            self.set_status("Export cancelled.")
+
+        self.set_busy(True)
+        self.set_status(f"Exporting {total} events...")
+        self.jobs.start(
+            # Exporting over a previous export keeps UIDs and bumps SEQUENCE on
+            # changed events, so calendar clients update instead of duplicating
+            lambda job: extractor.sync_ics(records, file_path, progress=job.progress),
+            on_progress=export_progress,
+            on_done=export_done,
+            on_error=export_failed,
+            on_cancel=export_cancelled,
+        )
+
+    def on_tree_press(self, event):
+        # Heading commands get no event; remember Shift for sort_by_column
+        self._heading_shift = (self.tree.identify_region(event.x, event.y) == "heading"
+                               and bool(event.state & 0x0001))
+
+    def sort_by_column(self, col):
+        # Sort the row keys rather than moving Treeview items, so the order
+        # survives later refreshes
+        add, self._heading_shift = self._heading_shift, False
+        columns = [c for c, _reverse in self.sort_spec]
+        if col in columns and (add or columns[0] == col):
+            i = columns.index(col)
+            self.sort_spec[i] = (col, not self.sort_spec[i][1])
+        elif add:
+            self.sort_spec.append((col, False))
+        else:
+            self.sort_spec = [(col, False)]
+        self.update_headings()
+        self.refresh_tree()
+
+    def update_headings(self):
+        # Arrow per sorted column, numbered when sorting by several
+        marks = {}
+        for i, (col, reverse) in enumerate(self.sort_spec, start=1):
+            arrow = "\u25bc" if reverse else "\u25b2"
+            marks[col] = f" {arrow}{i}" if len(self.sort_spec) > 1 else f" {arrow}"
+        for col in COLUMNS:
+            self.tree.heading(col, text=col.capitalize() + marks.get(col, ""))
 
 class EditEventDialog(tk.Toplevel):
     def __init__(self, parent, event_data, on_save):
@@ -457,14 +551,12 @@ class EditEventDialog(tk.Toplevel):
 
     def save(self):
         # Validate date
-        date_str = self.date_var.get().strip()
-        try:
-            datetime.strptime(date_str, "%Y-%m-%d")
-        except Exception:
-            messagebox.showerror("Invalid Date", "Date must be in YYYY-MM-DD format.")
+        date_val = dates.parse_date(self.date_var.get())
+        if date_val is None:
+            messagebox.showerror("Invalid Date", "Date must be in YYYY-MM-DD or DD.MM.YYYY format.")
             return
         updated_event = {
-            "date": date_str,
+            "date": date_val.isoformat(),
             "event_type": self.event_type_var.get().strip(),
             "project_code": self.project_code_var.get().strip(),
             "notes": self.notes_var.get().strip(),
@@ -473,5 +565,15 @@ class EditEventDialog(tk.Toplevel):
         self.destroy()
 
 if __name__ == "__main__":
-    app = EventExtractorApp()
-    app.mainloop() 
\ No newline at end of file
+    # PDF extraction uses a process pool; frozen bundles need this to spawn workers
+    multiprocessing.freeze_support()
+    instrument.setup_logging()
+    profile_dir = os.environ.get(instrument.PROFILE_ENV)
+    if profile_dir:
+        # Stage trace, cProfile and tracemalloc reports of the whole session
+        with instrument.capture(profile_dir):
+            app = EventExtractorApp()
+            app.mainloop()
+    else:
+        app = EventExtractorApp()
+        app.mainloop()
@@ -0,0 +1,150 @@
+"""Merged import of many schedules into one deduplicated event set.
+
+Files are parsed in worker processes (every sheet of a workbook, every table
+of a PDF) and come back in input order. Events are deduplicated on
+(date, event_type, project_code) through a hash set, so the same delivery
+listed in several exports shows up once; the first occurrence wins.
+"""
+import os
+
+import cache as parse_cache
+import extractor
+
+# Below this many files per worker the pool start-up is not worth it
+FILES_PER_WORKER = 4
+
+
+def event_key(event):
+    return (event["date"], event["event_type"], event["project_code"])
+
+
+class EventMerger:
+    def __init__(self, seen=()):
+        self._seen = set(seen)  # keys of events already in the merged set
+        self.added = 0
+        self.duplicates = 0
+        self.failures = []  # [(file_path, message)]
+
+    def add_many(self, events):
+        # Returns the events not seen before, in their original order
+        seen = self._seen
+        fresh = []
+        for event in events:
+            key = event_key(event)
+            if key in seen:
+                continue
+            seen.add(key)
+            fresh.append(event)
+        self.duplicates += len(events) - len(fresh)
+        self.added += len(fresh)
+        return fresh
+
+    def summary(self):
+        parts = [f"{self.duplicates} duplicate{'s' if self.duplicates != 1 else ''} dropped"]
+        if self.failures:
+            parts.append(f"{len(self.failures)} file{'s' if len(self.failures) != 1 else ''} failed")
+        return ", ".join(parts)
+
+
+def _parse_for_merge(file_path, pages=None, prescan=True, cache=None, schema=None, pack=True):
+    # Runs inside pool workers. Events travel back packed, which pickles
+    # much smaller than a list of dicts; a failing file is reported instead
+    # of taking the whole merge down. File digests go back to the parent,
+    # which saves the cache index once.
+    hits = cache.hits if cache is not None else 0
+    misses = cache.misses if cache is not None else 0
+    try:
+        events = extractor.parse_file(file_path, workers=1, pages=pages, prescan=prescan, cache=cache,
+                                      all_sheets=True, schema=schema)
+    except Exception as e:
+        packed, error = None, str(e)
+    else:
+        packed, error = (parse_cache.pack_events(events) if pack else events), None
+    digests = {}
+    if cache is not None:
+        hits, misses = cache.hits - hits, cache.misses - misses
+        digests = cache.take_new_digests()
+    return file_path, packed, error, hits, misses, digests
+
+
+def _parse_batch(file_paths, pages, prescan, cache, schema):
+    return [_parse_for_merge(path, pages, prescan, cache, schema) for path in file_paths]
+
+
+def iter_parsed_files(file_paths, workers=None, pages=None, prescan=True, cache=None, schema=None):
+    # Yields (file_path, events, error) in input order; error is None, or the
+    # message of a file that failed (events is None then). At most `workers`
+    # processes parse at once (default: by file count, up to the CPU count).
+    file_paths = list(file_paths)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(file_paths) // FILES_PER_WORKER)
+    try:
+        yield from _iter_parsed_files(file_paths, workers, pages, prescan, cache, schema)
+    finally:
+        if cache is not None:
+            cache.save_index()
+
+
+def _iter_parsed_files(file_paths, workers, pages, prescan, cache, schema):
+    if workers <= 1:
+        for path in file_paths:
+            file_path, events, error, _hits, _misses, digests = _parse_for_merge(
+                path, pages, prescan, cache, schema, pack=False)
+            if cache is not None:
+                cache.add_digests(digests)
+            yield file_path, events, error
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers)
+    futures = []
+    try:
+        # Each worker gets its own copy of the cache handle; entries land in
+        # the shared directory, counts and file digests are added back up here.
+        # Files go out in batches, taken back in submission order.
+        size = max(1, len(file_paths) // (workers * 8))
+        futures = [pool.submit(_parse_batch, file_paths[i:i + size], pages, prescan, cache, schema)
+                   for i in range(0, len(file_paths), size)]
+        for future in futures:
+            for file_path, packed, error, hits, misses, digests in future.result():
+                if cache is not None:
+                    cache.hits += hits
+                    cache.misses += misses
+                    cache.add_digests(digests)
+                yield file_path, (parse_cache.unpack_events(packed) if error is None else None), error
+    except BaseException:
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+        raise
+    pool.shutdown()
+
+
+def iter_merged_events(file_paths, merger=None, workers=None, pages=None, prescan=True, cache=None,
+                       progress=None, schema=None):
+    # Yields each file's new (not yet seen) events as a list, in input order.
+    # Duplicate and failure counts are collected on `merger`.
+    # progress(files_done, files_total) is called after every file.
+    merger = merger if merger is not None else EventMerger()
+    file_paths = list(file_paths)
+    results = iter_parsed_files(file_paths, workers, pages, prescan, cache, schema)
+    try:
+        for done, (file_path, events, error) in enumerate(results, start=1):
+            if error is not None:
+                merger.failures.append((file_path, error))
+            else:
+                fresh = merger.add_many(events)
+                if fresh:
+                    yield fresh
+            if progress:
+                progress(done, len(file_paths))
+    finally:
+        # A cancelled merge stops the pool right away
+        results.close()
+
+
+def merge_files(file_paths, merger=None, workers=None, pages=None, prescan=True, cache=None, schema=None):
+    merged = []
+    for events in iter_merged_events(file_paths, merger, workers, pages, prescan, cache, schema=schema):
+        merged.extend(events)
+    return merged
@@ -0,0 +1,164 @@
+"""Header-to-column schema shared by the XLSM and PDF parsers.
+
+A schema names the event columns and the ways their headers may be spelled:
+exact aliases and regular expressions, both matched case-insensitively
+against the whitespace-normalized header text. Schemas are loaded from JSON
+(or TOML where tomllib is available) and compiled once; header lookups are
+cached because the same few headers repeat on every sheet and page.
+
+    {
+      "header_search_rows": 3,
+      "event_columns": [
+        {"name": "Zustellung zu CCR", "aliases": ["Zust. CCR"]},
+        {"name": "CCR"},
+        {"name": "Zustellung zu ITV", "patterns": ["zustellung\\s+(zu\\s+)?itv"]}
+      ]
+    }
+
+The event type of an extracted event is the column's name, whatever alias
+the file used. header_search_rows is how many leading rows of a sheet or
+table may hold the header row (title rows above it are skipped).
+"""
+import json
+import os
+import re
+
+SCHEMA_ENV = "ICAL_EXTRACTOR_SCHEMA"
+DEFAULT_SCHEMA = {
+    "header_search_rows": 1,
+    "event_columns": [
+        {"name": "Zustellung zu CCR"},
+        {"name": "CCR"},
+        {"name": "Zustellung zu ITV"},
+    ],
+}
+# Distinct header cells remembered per schema
+LOOKUP_CACHE_SIZE = 4096
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def normalize_header(h):
+    # Collapse whitespace and line breaks; empty cells become None
+    if not h:
+        return None
+    return " ".join(str(h).split()) or None
+
+
+def _string_list(column, key, name):
+    # "aliases" / "patterns" of a column: a list of strings. A bare string
+    # would otherwise be taken apart into one-letter aliases.
+    values = column.get(key, []) if isinstance(column, dict) else []
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise SchemaError(f"Invalid schema: {key} of {name!r} must be a list of strings, not {values!r}")
+    return values
+
+
+class Schema:
+    def __init__(self, config):
+        try:
+            columns = config["event_columns"]
+            self.header_search_rows = int(config.get("header_search_rows", 1))
+        except (KeyError, TypeError, ValueError) as e:
+            raise SchemaError(f"Invalid schema: {e}") from None
+        if not isinstance(columns, list):
+            raise SchemaError(f"Invalid schema: event_columns must be a list, not {columns!r}")
+        if self.header_search_rows < 1 or not columns:
+            raise SchemaError("Invalid schema: needs event_columns and header_search_rows >= 1")
+        self.names = []
+        self._exact = {}  # casefolded alias -> column name
+        self._patterns = []  # [(compiled regex, column name)]
+        self._lookup = {}
+        for column in columns:
+            name = normalize_header(column.get("name") if isinstance(column, dict) else column)
+            if not name:
+                raise SchemaError(f"Invalid schema: event column without a name: {column!r}")
+            self.names.append(name)
+            aliases = [name] + _string_list(column, "aliases", name)
+            for alias in aliases:
+                alias = normalize_header(alias)
+                if alias:
+                    self._exact.setdefault(alias.casefold(), name)
+            for pattern in _string_list(column, "patterns", name):
+                try:
+                    self._patterns.append((re.compile(pattern, re.IGNORECASE), name))
+                except re.error as e:
+                    raise SchemaError(f"Invalid pattern {pattern!r} for {name!r}: {e}") from None
+        # Whitespace-free aliases for the PDF page pre-scan, which sees
+        # headers wrapped across lines
+        self.compact_aliases = ["".join(alias.split()) for alias in self._exact]
+        self.fingerprint = json.dumps(
+            [self.header_search_rows, sorted(self._exact.items()),
+             [(p.pattern, name) for p, name in self._patterns]], ensure_ascii=False)
+
+    def match(self, header):
+        # Raw header cell -> column name or None
+        try:
+            return self._lookup[header]
+        except KeyError:
+            pass
+        except TypeError:
+            header = str(header)  # unhashable cell value
+        name = None
+        norm = normalize_header(header)
+        if norm:
+            name = self._exact.get(norm.casefold())
+            if name is None:
+                for pattern, column in self._patterns:
+                    if pattern.fullmatch(norm):
+                        name = column
+                        break
+        if len(self._lookup) < LOOKUP_CACHE_SIZE:
+            self._lookup[header] = name
+        return name
+
+    def event_columns(self, headers):
+        # -> [(index, column name)] for the header cells naming event columns
+        match = self.match
+        return [(i, name) for i, name in enumerate(map(match, headers)) if name]
+
+    def find_header(self, rows):
+        # Looks for the header row among the first header_search_rows rows;
+        # -> (row index, event columns), or (None, []) if there is none
+        for i, row in enumerate(rows[:self.header_search_rows]):
+            event_columns = self.event_columns(row)
+            if event_columns:
+                return i, event_columns
+        return None, []
+
+    def mentions_header(self, text):
+        # True if page text may contain one of the event headers
+        compact = "".join(text.split()).casefold()
+        if any(alias in compact for alias in self.compact_aliases):
+            return True
+        return any(pattern.search(text) for pattern, _name in self._patterns)
+
+
+def load_schema(file_path):
+    try:
+        if file_path.lower().endswith(".toml"):
+            import tomllib  # Python 3.11+
+            with open(file_path, "rb") as f:
+                config = tomllib.load(f)
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+    except ImportError:
+        raise SchemaError("TOML schemas need Python 3.11+; use JSON instead") from None
+    except (OSError, ValueError) as e:
+        raise SchemaError(f"Could not read schema {file_path}: {e}") from None
+    return Schema(config)
+
+
+_default = None
+
+
+def default_schema():
+    # $ICAL_EXTRACTOR_SCHEMA if set, otherwise the built-in columns
+    global _default
+    if _default is None:
+        path = os.environ.get(SCHEMA_ENV)
+        _default = load_schema(path) if path else Schema(DEFAULT_SCHEMA)
+    return _default
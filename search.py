@@ -0,0 +1,164 @@
+"""Indexed event search used by the search bar.
+
+Query syntax (all terms must match, case-insensitive substring matching):
+
+    4711                    any field contains "4711"
+    type:CCR code:4711      field-scoped terms (date, type, code, notes)
+    date:2024-01..2024-03   ISO date range, either end may be left open
+    "zu itv"                quotes keep spaces inside a term
+"""
+import shlex
+
+FIELDS = ("date", "event_type", "project_code", "notes")
+FIELD_ALIASES = {
+    "date": "date",
+    "type": "event_type",
+    "event_type": "event_type",
+    "code": "project_code",
+    "project": "project_code",
+    "project_code": "project_code",
+    "note": "notes",
+    "notes": "notes",
+}
+RANGE_SEP = ".."
+
+
+def parse_query(text):
+    # -> list of (field or None, kind, value); kind is "substr" or "range"
+    try:
+        parts = shlex.split(text)
+    except ValueError:
+        parts = text.split()  # unbalanced quote while typing
+    terms = []
+    for part in parts:
+        field = None
+        name, sep, value = part.partition(":")
+        if sep and name.lower() in FIELD_ALIASES:
+            field = FIELD_ALIASES[name.lower()]
+            part = value
+        part = part.lower()
+        if not part:
+            continue
+        if RANGE_SEP in part and field in (None, "date"):
+            start, _, end = part.partition(RANGE_SEP)
+            terms.append(("date", "range", (start, end)))
+        else:
+            terms.append((field, "substr", part))
+    return terms
+
+
+def _in_range(value, start, end):
+    # Prefix comparison so "2024-01..2024-03" covers whole months
+    if start and value[:len(start)] < start:
+        return False
+    if end and value[:len(end)] > end:
+        return False
+    return True
+
+
+class SearchIndex:
+    # Per field, each distinct lowercased value maps to the set of row keys
+    # holding it. Schedules repeat dates, types and codes heavily, so a term
+    # is checked against the distinct values instead of every event.
+    def __init__(self, rows=()):
+        self.order = []
+        self._values = {field: {} for field in FIELDS}
+        self._row_values = {}
+        self._last_query = None
+        self._last_result = None
+        for key, event in rows:
+            self._add(key, event)
+            self.order.append(key)
+
+    def _add(self, key, event):
+        lowered = tuple(str(event[field]).lower() for field in FIELDS)
+        self._row_values[key] = lowered
+        for field, value in zip(FIELDS, lowered):
+            self._values[field].setdefault(value, set()).add(key)
+
+    def _remove(self, key):
+        lowered = self._row_values.pop(key)
+        for field, value in zip(FIELDS, lowered):
+            keys = self._values[field][value]
+            keys.discard(key)
+            if not keys:
+                del self._values[field][value]
+
+    def add_many(self, rows):
+        for key, event in rows:
+            self._add(key, event)
+            self.order.append(key)
+        self._last_query = None
+
+    def update(self, key, event):
+        self._remove(key)
+        self._add(key, event)
+        self._last_query = None
+
+    def update_many(self, rows):
+        for key, event in rows:
+            self._remove(key)
+            self._add(key, event)
+        self._last_query = None
+
+    def remove_many(self, keys):
+        # Drop keys in one pass over the row order instead of rebuilding
+        removed = set(keys)
+        for key in removed:
+            if key in self._row_values:
+                self._remove(key)
+        self.order = [key for key in self.order if key not in removed]
+        if self._last_result is not None:
+            self._last_result = [key for key in self._last_result if key not in removed]
+
+    def _term_keys(self, field, kind, value):
+        fields = (field,) if field else FIELDS
+        matched = set()
+        for f in fields:
+            for distinct, keys in self._values[f].items():
+                if kind == "range":
+                    hit = _in_range(distinct, *value)
+                else:
+                    hit = value in distinct
+                if hit:
+                    matched |= keys
+        return matched
+
+    def filter(self, text):
+        # Returns matching row keys in index order
+        text = text.strip()
+        if not text:
+            self._last_query = None
+            return list(self.order)
+        terms = parse_query(text)
+        matched = None
+        for term in terms:
+            keys = self._term_keys(*term)
+            matched = keys if matched is None else matched & keys
+            if not matched:
+                break
+        previous = self.order
+        if self._narrows(terms):
+            previous = self._last_result
+        if matched is None:
+            result = list(previous)
+        else:
+            result = [key for key in previous if key in matched]
+        self._last_query = terms
+        self._last_result = result
+        return result
+
+    def _narrows(self, terms):
+        # True if every row matching `terms` also matched the previous query:
+        # each previous term is still there, on the same field, and only got
+        # longer. The previous (already ordered) result can then be filtered
+        # instead of walking every row.
+        last = self._last_query
+        if last is None or len(terms) < len(last):
+            return False
+        for (field, kind, value), (old_field, old_kind, old_value) in zip(terms, last):
+            if kind != "substr" or old_kind != "substr" or field != old_field:
+                return False
+            if old_value not in value:
+                return False
+        return True
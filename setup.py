@@ -5,7 +5,7 @@ DATA_FILES = []
 OPTIONS = {
     'argv_emulation': True,
     'iconfile': 'icon.icns',  # Place your icon.icns in the same folder
-    'packages': ['openpyxl', 'pdfplumber', 'icalendar'],
+    'packages': ['openpyxl', 'pdfplumber', 'ttkthemes'],
 }
 
 setup(
@@ -0,0 +1,88 @@
+"""Typed, multi-column sorting of event IDs on the model side.
+
+Each column has a typed key: dates sort by ordinal, project codes and notes
+naturally ("P9" before "P10"), event types case-insensitively. Instead of
+computing that key per row on every sort, each column keeps a rank per
+distinct value (schedules repeat the same few values a lot), so a sort is a
+dict lookup per row and ints compare fast. Ranks are independent of the
+current filter and survive edits: a value that has not been ranked yet just
+triggers a re-rank of the distinct values on the next sort.
+"""
+import re
+from operator import attrgetter
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def natural_key(value):
+    # "P10b" -> ("p", 10, "b"); re.split keeps text and numbers alternating,
+    # so keys of different values always compare position by position
+    parts = _DIGITS.split(str(value).casefold())
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(parts))
+
+
+def text_key(value):
+    return str(value).casefold()
+
+
+# column -> (record attribute, key function or None if the attribute is
+# already an int in the right order)
+COLUMN_KEYS = {
+    "date": ("ordinal", None),
+    "event_type": ("event_type", text_key),
+    "project_code": ("project_code", natural_key),
+    "notes": ("notes", natural_key),
+}
+
+
+class SortIndex:
+    def __init__(self, store):
+        self.store = store
+        self._ranks = {}  # column -> {distinct value: rank}
+
+    def invalidate(self):
+        self._ranks.clear()
+
+    def _rank_values(self, column):
+        attr, key = COLUMN_KEYS[column]
+        values = {getattr(record, attr) for record in self.store}
+        ranks = self._ranks[column] = {value: rank for rank, value in enumerate(sorted(values, key=key))}
+        return ranks
+
+    def row_key(self, column):
+        # -> function mapping an event ID to an int that sorts like the column
+        attr, key = COLUMN_KEYS[column]
+        get_record = self.store.record_getter()
+        get_value = attrgetter(attr)
+        if key is None:
+            return lambda event_id: get_value(get_record(event_id))
+        ranks = self._ranks.get(column)
+        if ranks is None:
+            ranks = self._rank_values(column)
+        return lambda event_id: ranks[get_value(get_record(event_id))]
+
+    def sort(self, rows, spec):
+        # Sorts the list of event IDs in place by spec = [(column, reverse),
+        # ...], first column first. Stable, so ties keep the incoming order.
+        if not spec:
+            return rows
+        original = rows[:] if len(spec) > 1 else None
+        try:
+            self._sort(rows, spec)
+        except KeyError:
+            # A value added or edited since the columns were ranked; a
+            # failed single sort leaves the list untouched, a multi-column
+            # run may have got halfway
+            if original is not None:
+                rows[:] = original
+            for column, _reverse in spec:
+                if COLUMN_KEYS[column][1] is not None:
+                    self._rank_values(column)
+            self._sort(rows, spec)
+        return rows
+
+    def _sort(self, rows, spec):
+        # One stable sort per column, last column first, is faster than a
+        # single sort on tuple keys; reverse=True keeps ties stable too
+        for column, reverse in reversed(spec):
+            rows.sort(key=self.row_key(column), reverse=reverse)
@@ -0,0 +1,51 @@
+import unittest
+
+import extractor
+from event_store import EventStore
+from search import SearchIndex
+
+TYPES = ("CCR", "Zustellung zu CCR", "Zustellung zu ITV")
+EVENTS = 50000
+QUERY = "type:ccr"
+
+
+def events(n):
+    for i in range(n):
+        yield extractor.make_event(f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", TYPES[i % 3], f"P{i % 5000}",
+                                   f"n{i}")
+
+
+class BulkDeleteTest(unittest.TestCase):
+    # What the GUI's bulk delete does to the model (main.delete_events),
+    # without Tk
+    def test_delete_selection_under_filter(self):
+        store = EventStore(events(EVENTS))
+        index = SearchIndex(store.items())
+        visible = index.filter(QUERY)
+        self.assertTrue(0 < len(visible) < EVENTS)
+        selection = visible[1::2]
+        selected = set(selection)
+        expected = [event_id for event_id in store.ids() if event_id not in selected]
+        before = {event_id: store[event_id].values() for event_id in expected}
+        self.assertEqual(store.remove_many(selection), len(selection))
+        index.remove_many(selection)
+        self.assertEqual(list(store.ids()), expected)
+        self.assertTrue(all(store[event_id].values() == before[event_id] for event_id in expected))
+        # Same filter again: the unselected rows, in their old order
+        self.assertEqual(index.filter(QUERY), visible[0::2])
+        self.assertEqual(index.filter(""), expected)
+        self.assertEqual(index.filter("n1"), [event_id for event_id in expected
+                                              if "n1" in store[event_id].notes])
+
+    def test_bulk_edit_notes_under_filter(self):
+        store = EventStore(events(1000))
+        index = SearchIndex(store.items())
+        selection = index.filter(QUERY)[::3]
+        store.set_notes_many(selection, "moved")
+        index.update_many((event_id, store[event_id]) for event_id in selection)
+        self.assertEqual(index.filter("notes:moved"), selection)
+        self.assertEqual(index.filter(QUERY + " moved"), selection)
+
+
+if __name__ == "__main__":
+    unittest.main()
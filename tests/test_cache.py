@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+
+import fixtures
+from cache import INDEX_NAME, ParseCache
+from merge import merge_files
+
+
+class FileIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.cache_dir = os.path.join(self.tmp, "cache")
+        self.index_path = os.path.join(self.cache_dir, INDEX_NAME)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def plans(self, count):
+        return [fixtures.make_xlsm(os.path.join(self.tmp, f"plan{i}.xlsm"), rows=20, offset_days=i * 30)
+                for i in range(count)]
+
+    def saved_paths(self):
+        with open(self.index_path, encoding="utf-8") as f:
+            return set(json.load(f))
+
+    def test_saved_once_and_pruned(self):
+        paths = self.plans(3)
+        cache = ParseCache(self.cache_dir)
+        for path in paths:
+            cache.file_digest(path)
+        self.assertFalse(os.path.exists(self.index_path))
+        cache.save_index()
+        self.assertEqual(self.saved_paths(), set(paths))
+        os.remove(paths[0])
+        cache = ParseCache(self.cache_dir)
+        cache.file_digest(paths[1])  # known: nothing to save
+        cache.save_index()
+        self.assertEqual(self.saved_paths(), set(paths))
+        with open(paths[2], "ab") as f:
+            f.write(b"\0")
+        cache.file_digest(paths[2])
+        cache.save_index()
+        self.assertEqual(self.saved_paths(), set(paths[1:]))
+
+    def test_merge_workers_hand_digests_to_parent(self):
+        paths = self.plans(6)
+        cache = ParseCache(self.cache_dir)
+        merge_files(paths, workers=2, cache=cache)
+        self.assertEqual(self.saved_paths(), set(paths))
+        # Second run is served from the index without rehashing
+        cache = ParseCache(self.cache_dir)
+        merge_files(paths, workers=2, cache=cache)
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(cache.take_new_digests(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import cli
+import fixtures
+
+
+def run_cli(*argv):
+    err = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(err):
+        status = cli.main(list(argv) + ["--no-cache"])
+    return status, err.getvalue()
+
+
+class OutputPathTest(unittest.TestCase):
+    def test_same_name_in_two_directories_is_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for d in ("d1", "d2"):
+                os.mkdir(os.path.join(tmp, d))
+                fixtures.make_xlsm(os.path.join(tmp, d, "plan.xlsm"), rows=5)
+            out = os.path.join(tmp, "o")
+            status, err = run_cli(os.path.join(tmp, "d1"), os.path.join(tmp, "d2"), "-o", out)
+            self.assertEqual(status, 2)
+            self.assertIn("plan.ics", err)
+            self.assertFalse(os.path.exists(out))
+
+    def test_same_stem_different_extension_is_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fixtures.make_xlsm(os.path.join(tmp, "plan.xlsm"), rows=5)
+            fixtures.make_xlsm(os.path.join(tmp, "plan.pdf"), rows=5)  # never parsed
+            status, _err = run_cli(tmp, "-o", os.path.join(tmp, "o"))
+            self.assertEqual(status, 2)
+
+    def test_recursive_mirrors_subdirectories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src")
+            for d in ("a", "b"):
+                os.makedirs(os.path.join(src, d))
+                fixtures.make_xlsm(os.path.join(src, d, "plan.xlsm"), rows=5)
+            out = os.path.join(tmp, "o")
+            status, _err = run_cli(src, "-r", "-o", out)
+            self.assertEqual(status, 0)
+            self.assertTrue(os.path.exists(os.path.join(out, "a", "plan.ics")))
+            self.assertTrue(os.path.exists(os.path.join(out, "b", "plan.ics")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from openpyxl import Workbook
+
+import extractor
+from dates import DateRecognizer
+
+
+class FindDateColumnTest(unittest.TestCase):
+    def test_real_dates_beat_serial_like_numbers(self):
+        # Nr | Datum | CCR: order numbers left of the date column look like
+        # Excel serials (30000 = 1982-02-18)
+        rows = [[30000 + i, datetime(2024, 1, 1 + i), f"C{i}"] for i in range(10)]
+        self.assertEqual(DateRecognizer().find_date_column(rows, exclude={2}), 1)
+
+    def test_matched_strings_beat_serials(self):
+        rows = [[45000, "01.02.2024", "x"] for _ in range(5)]
+        self.assertEqual(DateRecognizer().find_date_column(rows), 1)
+
+    def test_serials_used_when_nothing_else_has_dates(self):
+        rows = [["x", 45292, "y"] for _ in range(5)]
+        recognizer = DateRecognizer()
+        self.assertEqual(recognizer.find_date_column(rows), 1)
+        self.assertEqual(recognizer.recognize(45292), date(2024, 1, 1))
+
+    def test_formats_with_literal_prefix(self):
+        recognizer = DateRecognizer(formats=("KW %d.%m.%Y", "(%Y-%m-%d)"))
+        self.assertEqual(recognizer.recognize("KW 01.02.2024"), date(2024, 2, 1))
+        self.assertEqual(recognizer.recognize(" (2024-02-03) "), date(2024, 2, 3))
+        self.assertIsNone(recognizer.recognize("Termin"))
+        self.assertEqual(DateRecognizer().recognize("01.02.2024"), date(2024, 2, 1))
+
+    def test_xlsm_with_number_column_left_of_dates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plan.xlsm")
+            wb = Workbook()
+            ws = wb.active
+            ws.append(["Nr", "Datum", "CCR"])
+            ws.append([30000, datetime(2024, 1, 1), "C1"])
+            wb.save(path)
+            events = extractor.parse_xlsm(path)
+        self.assertEqual(events, [extractor.make_event("2024-01-01", "CCR", "C1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
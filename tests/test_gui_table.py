@@ -0,0 +1,84 @@
+import os
+import tempfile
+import tkinter as tk
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import extractor
+from event_store import EventStore
+
+TYPES = ("CCR", "Zustellung zu CCR", "Zustellung zu ITV")
+QUERY = "type:ITV"
+
+
+class FilteredTableTest(unittest.TestCase):
+    # Bulk delete / edit go from the rows selected in the table to event IDs;
+    # rows hidden by the filter must never be touched
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        env = mock.patch.dict(os.environ, {"ICAL_EXTRACTOR_CACHE": self._tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
+        import main
+        try:
+            self.app = main.EventExtractorApp()
+        except tk.TclError as e:
+            self._tmp.cleanup()
+            self.skipTest(f"no display: {e}")
+        self.app.withdraw()
+        events = [extractor.make_event(f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", TYPES[i % 3], f"P{i}", "")
+                  for i in range(300)]
+        self.app.store = EventStore(events)
+        self.app.reindex()
+        self.app.sort_spec = [("date", True)]
+        self.app.search_var.set(QUERY)
+        self.app.run_search()
+        self.before = {event_id: record.values() for event_id, record in self.app.store.items()}
+        self.visible = self.app.search_index.filter(QUERY)
+        self.assertTrue(0 < len(self.visible) < len(self.before))
+
+    def tearDown(self):
+        self.app.destroy()
+        self._tmp.cleanup()
+
+    def test_bulk_delete_removes_only_the_filtered_selection(self):
+        table = self.app.table
+        table.select_all()
+        selected = table.selection()
+        self.assertEqual(set(selected), set(self.visible))
+        self.app.bulk_delete_events()
+        survivors = set(self.before) - set(selected)
+        self.assertEqual(set(self.app.store.ids()), survivors)
+        self.assertTrue(all(self.app.store[event_id].values() == self.before[event_id] for event_id in survivors))
+        self.assertEqual(table.keys, [])
+        self.assertEqual(table.selection(), [])
+        self.app.search_var.set("")
+        self.app.run_search()
+        self.assertEqual(set(table.keys), survivors)
+
+    def test_heading_click_keeps_rows_selected_out_of_view(self):
+        table = self.app.table
+        table.select_all()
+        # Press on the heading (no row there), then the sort it triggers;
+        # the re-render's <<TreeviewSelect>> must not count as a plain click
+        table._on_click(SimpleNamespace(x=10, y=2, state=0))
+        self.app.sort_by_column("project_code")
+        table._on_select()
+        self.assertEqual(set(table.selection()), set(self.visible))
+
+    def test_bulk_edit_changes_only_the_selected_rows(self):
+        table = self.app.table
+        key = table.keys[len(table.keys) // 2]
+        table.select_key(key)
+        self.assertEqual(table.selection(), [key])
+        with mock.patch("main.simpledialog.askstring", return_value="moved"):
+            self.app.bulk_edit_notes()
+        for event_id, values in self.before.items():
+            expected = values[:3] + ("moved",) if event_id == key else values
+            self.assertEqual(self.app.store[event_id].values(), expected)
+        self.assertEqual(self.app.search_index.filter("moved"), [key])
+
+
+if __name__ == "__main__":
+    unittest.main()
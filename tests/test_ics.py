@@ -0,0 +1,75 @@
+import os
+import stat
+import tempfile
+import unittest
+
+import ics
+
+CALENDAR = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\nSUMMARY:CCR: P1\r\nDTSTART;VALUE=DATE:20240231\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nSUMMARY:CCR: P2\r\nDTSTART;VALUE=DATE:20240229\r\n"
+    "DESCRIPTION:Lieferung f{split}r München\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+def write_calendar(tmp, text):
+    path = os.path.join(tmp, "cal.ics")
+    with open(path, "wb") as f:
+        f.write(text)
+    return path
+
+
+class IcsReaderTest(unittest.TestCase):
+    def read(self, text):
+        with tempfile.TemporaryDirectory() as tmp:
+            return list(ics.iter_ics_events(write_calendar(tmp, text)))
+
+    def test_invalid_dtstart_is_skipped(self):
+        events = self.read(CALENDAR.replace("{split}", "ü").encode("utf-8"))
+        self.assertEqual([e["date"] for e in events], ["2024-02-29"])
+
+    def test_fold_inside_multibyte_character(self):
+        # "ü" is C3 BC; fold between the two bytes
+        data = CALENDAR.replace("{split}", "\x00").encode("utf-8").replace(b"\x00", b"\xc3\r\n \xbc")
+        events = self.read(data)
+        self.assertEqual(events[0]["notes"], "Lieferung für München")
+
+    def test_round_trip(self):
+        events = [{"date": "2024-03-01", "event_type": "CCR", "project_code": "Pä", "notes": "x" * 200}]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.ics")
+            ics.write_ics(events, path)
+            self.assertEqual(list(ics.iter_ics_events(path)), events)
+
+
+@unittest.skipIf(os.name == "nt", "POSIX permissions")
+class IcsWriterModeTest(unittest.TestCase):
+    EVENTS = [{"date": "2024-03-01", "event_type": "CCR", "project_code": "P1", "notes": ""}]
+
+    def mode(self, path):
+        return stat.S_IMODE(os.stat(path).st_mode)
+
+    def test_new_file_gets_umask_mode(self):
+        umask = os.umask(0o027)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "out.ics")
+                ics.write_ics(self.EVENTS, path)
+                # The umask in effect when ics was imported, not the current one
+                self.assertEqual(self.mode(path), 0o666 & ~umask)
+        finally:
+            os.umask(umask)
+
+    def test_replaced_file_keeps_its_mode(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.ics")
+            ics.write_ics(self.EVENTS, path)
+            os.chmod(path, 0o640)
+            ics.write_ics(self.EVENTS, path)
+            self.assertEqual(self.mode(path), 0o640)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import extractor
+import ics_sync
+
+
+def event(day, code, notes=""):
+    return extractor.make_event(f"2024-03-{day:02d}", "CCR", code, notes)
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "all.ics")
+        self.delta_path = os.path.join(self._tmp.name, "all.delta.ics")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def sync(self, events):
+        stats = ics_sync.sync_ics(events, self.path, delta_path=self.delta_path)
+        return (stats.added, stats.changed, stats.removed, stats.unchanged)
+
+    def sequences(self):
+        return {uid: entry[0] for uid, entry in ics_sync.load_index(self.path).items()}
+
+    def uid(self, e):
+        return extractor.ics.event_uid(e)
+
+    def test_changed_event_bumps_sequence(self):
+        a, b = event(1, "P1"), event(2, "P2")
+        self.assertEqual(self.sync([a, b]), (2, 0, 0, 0))
+        self.assertEqual(self.sync([a, event(2, "P2", "moved")]), (0, 1, 0, 1))
+        self.assertEqual(self.sequences(), {self.uid(a): 0, self.uid(b): 1})
+        with open(self.path, encoding="utf-8", newline="") as f:
+            self.assertEqual(f.read().count("SEQUENCE:1\r\n"), 1)
+        # Only the change goes to the delta
+        self.assertEqual([e["notes"] for e in extractor.parse_ics(self.delta_path)], ["moved"])
+
+    def test_tombstone_continues_sequence(self):
+        a, b = event(1, "P1"), event(2, "P2")
+        self.sync([a, b])
+        self.sync([a, event(2, "P2", "x")])  # b at SEQUENCE 1
+        self.assertEqual(self.sync([a]), (0, 0, 1, 1))
+        index = ics_sync.load_index(self.path)
+        self.assertEqual(index[self.uid(b)][:2], [2, None])
+        with open(self.delta_path, encoding="utf-8", newline="") as f:
+            delta = f.read()
+        self.assertIn(f"UID:{self.uid(b)}\r\nSEQUENCE:2\r\nDTSTART;VALUE=DATE:20240302\r\nSTATUS:CANCELLED", delta)
+        # Removing again does not cancel twice
+        self.assertEqual(self.sync([a]), (0, 0, 0, 1))
+        # Coming back continues above the cancellation
+        self.assertEqual(self.sync([a, b]), (1, 0, 0, 1))
+        self.assertEqual(self.sequences()[self.uid(b)], 3)
+
+    def test_scan_without_sidecar_matches_serialized_events(self):
+        events = [event(1, "P1"), event(2, "P2", "Lieferung; " + "lang " * 30)]
+        self.sync(events)
+        self.sync([events[0], event(2, "P2", "geändert, " + "lang " * 30)])
+        saved = ics_sync.load_index(self.path)
+        os.remove(ics_sync.sidecar_path(self.path))
+        self.assertEqual(ics_sync.scan_ics(self.path), saved)
+        # Nothing looks changed to a sync that has only the calendar
+        self.assertEqual(self.sync([events[0], event(2, "P2", "geändert, " + "lang " * 30)]), (0, 0, 0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
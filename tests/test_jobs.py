@@ -0,0 +1,92 @@
+import threading
+import unittest
+
+from jobs import JobRunner
+
+
+class StubWidget:
+    # Stands in for the Tk widget: after() callbacks run when poll() is called
+    def __init__(self):
+        self.pending = []
+
+    def after(self, _ms, callback, *args):
+        self.pending.append((callback, args))
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for callback, args in pending:
+            callback(*args)
+
+
+def run_job(runner, widget, work, **handlers):
+    job = runner.start(work, **handlers)
+    job.thread.join(5)
+    while widget.pending:
+        widget.run_pending()
+    return job
+
+
+class JobRunnerTest(unittest.TestCase):
+    def test_done(self):
+        widget = StubWidget()
+        runner = JobRunner(widget)
+        chunks, results = [], []
+        run_job(runner, widget, lambda job: job.emit([1, 2]) or "ok",
+                on_chunk=chunks.extend, on_done=results.append)
+        self.assertEqual((chunks, results, runner.busy), ([1, 2], ["ok"], False))
+
+    def test_failing_chunk_handler_ends_the_job(self):
+        widget = StubWidget()
+        runner = JobRunner(widget)
+        errors = []
+
+        def on_chunk(items):
+            raise ValueError("bad chunk")
+
+        job = run_job(runner, widget, lambda job: job.emit([1]), on_chunk=on_chunk, on_error=errors.append)
+        self.assertFalse(runner.busy)
+        self.assertTrue(job.cancelled)
+        self.assertEqual([str(e) for e in errors], ["bad chunk"])
+        # The runner takes the next job
+        run_job(runner, widget, lambda job: None)
+        self.assertFalse(runner.busy)
+
+    def test_failing_progress_handler_ends_the_job(self):
+        widget = StubWidget()
+        runner = JobRunner(widget)
+        errors = []
+        reported = threading.Event()
+        release = threading.Event()
+
+        def on_progress(*args):
+            raise RuntimeError("bad progress")
+
+        def work(job):
+            job.progress(1, 2)
+            reported.set()
+            release.wait(5)
+            job.check()
+
+        job = runner.start(work, on_progress=on_progress, on_error=errors.append)
+        reported.wait(5)
+        widget.run_pending()
+        self.assertFalse(runner.busy)
+        self.assertTrue(job.cancelled)
+        self.assertEqual([str(e) for e in errors], ["bad progress"])
+        release.set()
+        job.thread.join(5)
+
+    def test_failing_final_handler_still_frees_the_runner(self):
+        widget = StubWidget()
+        runner = JobRunner(widget)
+
+        def on_done(result):
+            raise ValueError("bad done")
+
+        with self.assertRaises(ValueError):
+            run_job(runner, widget, lambda job: None, on_done=on_done)
+        self.assertFalse(runner.busy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+import extractor
+import fixtures
+from cache import ParseCache
+
+
+def rows(codes):
+    return [[f"0{day}.01.2024", "Projekt", "", code, ""] for day, code in enumerate(codes, start=1)]
+
+
+class PageCacheTest(unittest.TestCase):
+    def test_edited_form_xobject_is_not_served_from_cache(self):
+        # The page itself only says "/Fm1 Do"; the table lives in the form
+        page = ["q", "/Fm1 Do", "Q"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plan.pdf")
+            cache = ParseCache(os.path.join(tmp, "cache"))
+            fixtures.write_pdf(path, [page], form=fixtures._table_page(rows(["C1", "C2"]), fixtures.PDF_HEADERS))
+            first = extractor.page_digests(path, [1])
+            self.assertEqual([e["project_code"] for e in extractor.parse_pdf(path, workers=1, cache=cache)],
+                             ["C1", "C2"])
+            fixtures.write_pdf(path, [page], form=fixtures._table_page(rows(["C3", "C4"]), fixtures.PDF_HEADERS))
+            self.assertNotEqual(extractor.page_digests(path, [1]), first)
+            self.assertEqual([e["project_code"] for e in extractor.parse_pdf(path, workers=1, cache=cache)],
+                             ["C3", "C4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
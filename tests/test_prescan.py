@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+import extractor
+import fixtures
+from cache import ParseCache
+from dates import DateRecognizer
+
+US_DATES = DateRecognizer(formats=("%m/%d/%Y",))
+
+
+class StubPage:
+    def __init__(self, text):
+        self.chars = [{"text": ch} for ch in text]
+
+
+class PrescanTest(unittest.TestCase):
+    def test_uses_recognizer_formats(self):
+        page = StubPage("Shipment on 01/31/2024 to plant 4")
+        self.assertFalse(extractor.page_may_have_table(page))
+        self.assertTrue(extractor.page_may_have_table(page, recognizer=US_DATES))
+        self.assertFalse(extractor.page_may_have_table(StubPage("Revision 2.1, page 3"), recognizer=US_DATES))
+
+    def test_continuation_page_with_custom_format_is_read(self):
+        # Page 2 continues the table without a header; only its dates say it
+        # may hold rows
+        rows = [[f"01/{day:02d}/2024", "Projekt", "", f"C{day}", ""] for day in range(1, 11)]
+        pages = [fixtures._table_page(rows[:5], fixtures.PDF_HEADERS), fixtures._table_page(rows[5:], None)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = fixtures.write_pdf(os.path.join(tmp, "plan.pdf"), pages)
+            cache = ParseCache(os.path.join(tmp, "cache"))
+            # Fill the per-page cache with the default formats first: page 2
+            # is skipped there and that result must not be reused
+            self.assertEqual(len(extractor.parse_pdf(path, workers=1, cache=cache)), 0)
+            events = extractor.parse_pdf(path, workers=1, recognizer=US_DATES, cache=cache)
+        self.assertEqual([e["date"] for e in events], [f"2024-01-{day:02d}" for day in range(1, 11)])
+
+
+if __name__ == "__main__":
+    unittest.main()
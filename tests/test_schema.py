@@ -0,0 +1,22 @@
+import unittest
+
+from schema import Schema, SchemaError
+
+
+class SchemaConfigTest(unittest.TestCase):
+    def test_aliases_and_patterns(self):
+        schema = Schema({"event_columns": [{"name": "CCR", "aliases": ["CCR Termin"], "patterns": [r"ccr\s*\d"]}]})
+        self.assertEqual(schema.match("ccr  termin"), "CCR")
+        self.assertEqual(schema.match("CCR 2"), "CCR")
+        self.assertIsNone(schema.match("T"))
+
+    def test_string_instead_of_list_is_rejected(self):
+        for key, value in (("aliases", "CCR Termin"), ("patterns", "a.b"), ("aliases", [1]), ("patterns", None)):
+            with self.subTest(key=key, value=value), self.assertRaises(SchemaError):
+                Schema({"event_columns": [{"name": "CCR", key: value}]})
+        with self.assertRaises(SchemaError):
+            Schema({"event_columns": "CCR"})
+
+
+if __name__ == "__main__":
+    unittest.main()
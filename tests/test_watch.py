@@ -0,0 +1,167 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import extractor
+import fixtures
+import ics
+import ics_sync
+import watch
+
+
+def ics_sync_sequences(file_path):
+    return [entry[0] for entry in ics_sync.load_index(file_path).values()]
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.plans = os.path.join(self.tmp, "plans")
+        os.mkdir(self.plans)
+        self.out = os.path.join(self.tmp, "all.ics")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def plan(self, name, offset_days, age=0):
+        path = fixtures.make_xlsm(os.path.join(self.plans, name), rows=30, offset_days=offset_days)
+        if age:
+            mtime = time.time() - age
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def watcher(self, settle=0):
+        return watch.FolderWatcher([self.plans], watch.CombinedCalendar(self.out), workers=1, settle=settle)
+
+    def round(self, watcher):
+        return watcher.process(*watcher.poll())
+
+    def test_restart_with_file_still_settling_cancels_nothing(self):
+        self.plan("a.xlsm", 0, age=60)
+        self.plan("b.xlsm", 100, age=60)
+        self.round(self.watcher())
+        exported = len(extractor.parse_ics(self.out))
+        # Restart while b.xlsm is being re-uploaded (same content, fresh mtime)
+        self.plan("b.xlsm", 100)
+        watcher = self.watcher(settle=3600)
+        stats, _failures = self.round(watcher)
+        self.assertEqual(stats.removed, 0)
+        # Once it has settled it is read, and nothing changed
+        watcher.settle = 0
+        stats, _failures = self.round(watcher)
+        self.assertEqual((stats.added, stats.changed, stats.removed), (0, 0, 0))
+        self.assertEqual(len(extractor.parse_ics(self.out)), exported)
+
+    def test_restart_cancels_files_deleted_meanwhile(self):
+        self.plan("a.xlsm", 0, age=60)
+        b = self.plan("b.xlsm", 100, age=60)
+        self.round(self.watcher())
+        b_events = len(extractor.parse_xlsm(b))
+        os.remove(b)
+        stats, _failures = self.round(self.watcher())
+        self.assertEqual(stats.removed, b_events)
+
+    def test_file_failing_after_restart_keeps_its_events(self):
+        a = self.plan("a.xlsm", 0, age=60)
+        b = self.plan("b.xlsm", 100, age=60)
+        self.round(self.watcher())
+        exported = extractor.parse_ics(self.out)
+        b_events = extractor.parse_xlsm(b)
+        with open(b, "wb") as f:
+            f.write(b"not a workbook")
+        watcher = self.watcher()
+        _stats, failures = self.round(watcher)
+        self.assertEqual([path for path, _error in failures], [b])
+        # Another file changes: the calendar is rewritten, b's VEVENTs stay
+        self.plan("a.xlsm", 5)
+        stats, failures = self.round(watcher)
+        self.assertEqual(failures, [])
+        events = extractor.parse_ics(self.out)
+        self.assertTrue(all(event in events for event in b_events))
+        index = watcher.calendar.index
+        self.assertTrue(all(index[ics.event_uid(event)][1] is not None for event in b_events))
+        # ... and parse normally once b is readable again
+        self.plan("b.xlsm", 100)
+        stats, _failures = self.round(watcher)
+        self.assertEqual((stats.added, stats.removed), (0, 0))
+        self.assertEqual(len(extractor.parse_ics(self.out)), len(events))
+        self.assertNotEqual(events, exported)
+
+    def test_failed_file_deleted_later_is_cancelled(self):
+        self.plan("a.xlsm", 0, age=60)
+        b = self.plan("b.xlsm", 100, age=60)
+        self.round(self.watcher())
+        b_events = len(extractor.parse_xlsm(b))
+        with open(b, "wb") as f:
+            f.write(b"not a workbook")
+        watcher = self.watcher()
+        self.round(watcher)
+        os.remove(b)
+        stats, _failures = self.round(watcher)
+        self.assertEqual(stats.removed, b_events)
+        self.assertEqual(len(extractor.parse_ics(self.out)), len(extractor.parse_xlsm(os.path.join(self.plans, "a.xlsm"))))
+
+    def test_failed_write_is_retried(self):
+        paths = [self.plan("a.xlsm", 0, age=60), self.plan("b.xlsm", 100, age=60)]
+        calendar = watch.CombinedCalendar(self.out, os.path.join(self.tmp, "all.delta.ics"))
+        watcher = watch.FolderWatcher([self.plans], calendar, workers=1, settle=0)
+        self.round(watcher)
+        self.plan("a.xlsm", 5)
+        stop = threading.Event()
+
+        def share_gone(*args):
+            stop.set()
+            raise OSError("share gone")
+
+        with mock.patch("watch.write_vevents", side_effect=share_gone):
+            with self.assertLogs("ical_extractor", "ERROR"):
+                watcher.run(0, stop=stop)  # logs and keeps going until stopped
+        self.assertTrue(calendar.needs_write)
+        stats, _failures = self.round(watcher)  # nothing changed since
+        self.assertFalse(calendar.needs_write)
+        self.assertEqual((stats.added, stats.changed, stats.removed), (0, 0, 0))
+        from merge import event_key, merge_files
+        expected = [event_key(e) for e in merge_files(paths, workers=1)]
+        self.assertEqual([event_key(e) for e in extractor.parse_ics(self.out)], expected)
+        # The delta still carries the changes of the round whose write failed
+        self.assertTrue(extractor.parse_ics(calendar.delta_path))
+        self.assertEqual(set(ics_sync_sequences(self.out)), {0, 1})
+
+    def test_unreachable_folder_skips_the_round(self):
+        self.plan("a.xlsm", 0, age=60)
+        watcher = self.watcher()
+        self.round(watcher)
+        exported = extractor.parse_ics(self.out)
+        moved = self.plans + ".offline"
+        os.rename(self.plans, moved)  # share unmounted for a moment
+        with self.assertLogs("ical_extractor", "WARNING"):
+            self.assertEqual(watcher.poll(), ([], []))
+        os.rename(moved, self.plans)
+        self.assertEqual(watcher.poll(), ([], []))
+        self.assertEqual(extractor.parse_ics(self.out), exported)
+
+    def test_removed_file_input_is_gone(self):
+        a = self.plan("a.xlsm", 0, age=60)
+        watcher = watch.FolderWatcher([a], watch.CombinedCalendar(self.out), workers=1, settle=0)
+        self.round(watcher)
+        os.remove(a)
+        self.assertEqual(watcher.poll(), ([], [a]))
+
+    def test_matches_merged_import(self):
+        from merge import event_key, merge_files
+        paths = [self.plan(f"p{i}.xlsm", i * 10) for i in range(3)]
+        watcher = self.watcher()
+        self.round(watcher)
+        self.plan("p1.xlsm", 5)
+        os.remove(paths[2])
+        self.round(watcher)
+        expected = [event_key(e) for e in merge_files(paths[:2], workers=1)]
+        self.assertEqual([event_key(e) for e in extractor.parse_ics(self.out)], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
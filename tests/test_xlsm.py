@@ -0,0 +1,31 @@
+import os
+import re
+import tempfile
+import unittest
+import zipfile
+
+import extractor
+import fixtures
+
+
+class XlsmTest(unittest.TestCase):
+    def test_stale_dimension_tag(self):
+        # Some writers leave <dimension ref="A1"/>; read-only openpyxl would
+        # then stop after the first cell
+        with tempfile.TemporaryDirectory() as tmp:
+            good = fixtures.make_xlsm(os.path.join(tmp, "good.xlsm"), rows=50)
+            stale = os.path.join(tmp, "stale.xlsm")
+            with zipfile.ZipFile(good) as src, zipfile.ZipFile(stale, "w", zipfile.ZIP_DEFLATED) as dst:
+                for item in src.infolist():
+                    data = src.read(item)
+                    if item.filename.startswith("xl/worksheets/sheet"):
+                        data = re.sub(rb'<dimension ref="[^"]*" ?/>', b"", data)
+                        data = data.replace(b"<sheetViews>", b'<dimension ref="A1"/><sheetViews>', 1)
+                    dst.writestr(item, data)
+            expected = extractor.parse_xlsm(good, read_only=False)
+            self.assertTrue(expected)
+            self.assertEqual(extractor.parse_xlsm(stale), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
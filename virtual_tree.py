@@ -0,0 +1,226 @@
+"""Virtualized ttk.Treeview: only the rows in the viewport exist as Tk items.
+
+The model is an ordered list of row keys plus a callback returning the cell
+values for a key. A fixed pool of Treeview items is re-labelled on scroll, so
+refresh cost depends on the window height, not on the number of events.
+"""
+import tkinter as tk
+from tkinter import ttk
+import instrument
+
+PLACEHOLDER_TAG = "placeholder"
+
+
+class VirtualTreeview:
+    def __init__(self, parent, columns, get_values, placeholder="No events loaded"):
+        self.columns = columns
+        self.get_values = get_values
+        self.placeholder = placeholder
+        self.keys = []
+        self.top = 0
+        self.selected = set()
+        self._pool = []  # Treeview iids currently in use, top to bottom
+        self._item_keys = {}  # pool iid -> row key
+        self._visible_rows = 20
+        self._plain_click = False
+
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", selectmode="extended")
+        self.vsb = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
+        self.tree.tag_configure(PLACEHOLDER_TAG, foreground="#888888")
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<ButtonPress-1>", self._on_click, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda e: self._move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self._move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self._move_focus(-self._visible_rows))
+        self.tree.bind("<Next>", lambda e: self._move_focus(self._visible_rows))
+        self.tree.bind("<Control-a>", self._select_all)
+
+    # Model -----------------------------------------------------------------
+
+    def set_rows(self, keys):
+        self.keys = list(keys)
+        present = set(self.keys)
+        self.selected &= present
+        self.top = max(0, min(self.top, len(self.keys) - self._visible_rows))
+        self.render()
+
+    def remove_rows(self, keys):
+        removed = set(keys)
+        self.selected -= removed
+        self.set_rows([key for key in self.keys if key not in removed])
+
+    def update_row(self, key):
+        # Re-label a single visible row; off-screen rows pick it up on scroll
+        for iid, item_key in self._item_keys.items():
+            if item_key == key:
+                self.tree.item(iid, values=self.get_values(key))
+                return True
+        return False
+
+    def selection(self):
+        # Row keys in display order, including rows scrolled out of view
+        if not self.selected:
+            return []
+        return [k for k in self.keys if k in self.selected]
+
+    def select_all(self):
+        self.selected = set(self.keys)
+        self.render()
+
+    def key_for_item(self, iid):
+        return self._item_keys.get(iid)
+
+    def identify_key(self, y):
+        return self.key_for_item(self.tree.identify_row(y))
+
+    def focus_key(self):
+        return self.key_for_item(self.tree.focus())
+
+    def item_for_key(self, key):
+        for iid, item_key in self._item_keys.items():
+            if item_key == key:
+                return iid
+        return None
+
+    def select_key(self, key):
+        if key not in self.selected:
+            self.selected = {key}
+            self.render()
+
+    # Rendering -------------------------------------------------------------
+
+    def render(self):
+        with instrument.stage("tree.render", rows=len(self.keys)):
+            self._render()
+
+    def _render(self):
+        tree = self.tree
+        # selection_set below fires <<TreeviewSelect>>, which is not a click
+        self._plain_click = False
+        if not self.keys:
+            self._resize_pool(1)
+            iid = self._pool[0]
+            self._item_keys = {}
+            blank = ("",) * (len(self.columns) - 1)
+            tree.item(iid, values=(self.placeholder,) + blank, tags=(PLACEHOLDER_TAG,))
+            tree.selection_set(())
+            self.vsb.set(0.0, 1.0)
+            return
+        window = self.keys[self.top:self.top + self._visible_rows]
+        self._resize_pool(len(window))
+        self._item_keys = {}
+        selected_items = []
+        for offset, (iid, key) in enumerate(zip(self._pool, window)):
+            row = self.top + offset
+            tag = 'evenrow' if row % 2 == 0 else 'oddrow'
+            tree.item(iid, values=self.get_values(key), tags=(tag,))
+            self._item_keys[iid] = key
+            if key in self.selected:
+                selected_items.append(iid)
+        tree.selection_set(selected_items)
+        total = len(self.keys)
+        self.vsb.set(self.top / total, min(1.0, (self.top + len(window)) / total))
+
+    def _resize_pool(self, size):
+        while len(self._pool) < size:
+            self._pool.append(self.tree.insert("", tk.END, iid=f"row{len(self._pool)}"))
+        if len(self._pool) > size:
+            self.tree.delete(*self._pool[size:])
+            del self._pool[size:]
+
+    # Scrolling -------------------------------------------------------------
+
+    def yview(self, *args):
+        if not args:
+            return
+        total = len(self.keys)
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self._visible_rows
+            self._scroll_by(step)
+
+    def see(self, key):
+        try:
+            row = self.keys.index(key)
+        except ValueError:
+            return
+        if row < self.top:
+            self._scroll_to(row)
+        elif row >= self.top + self._visible_rows:
+            self._scroll_to(row - self._visible_rows + 1)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self.keys) - self._visible_rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.top + rows)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * delta)
+
+    def _on_configure(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # One row's worth of height is taken by the headings
+        rows = max(1, event.height // rowheight - 1)
+        if rows != self._visible_rows:
+            self._visible_rows = rows
+            self.top = max(0, min(self.top, len(self.keys) - rows))
+            self.render()
+
+    def _move_focus(self, step):
+        if not self.keys:
+            return "break"
+        current = self.focus_key()
+        row = self.keys.index(current) if current in self.selected else self.top
+        row = max(0, min(row + step, len(self.keys) - 1))
+        key = self.keys[row]
+        self.selected = {key}
+        self.see(key)
+        self.render()
+        iid = self.item_for_key(key)
+        if iid:
+            self.tree.focus(iid)
+        return "break"
+
+    def _select_all(self, event=None):
+        self.select_all()
+        return "break"
+
+    def _on_click(self, event):
+        # Without Shift/Control a click on a row replaces the whole
+        # selection. Clicks on headings or empty space do not change the
+        # selection, so they must not leave the flag set for a later render.
+        on_row = (self.tree.identify_region(event.x, event.y) in ("cell", "tree")
+                  and self.tree.identify_row(event.y) in self._item_keys)
+        self._plain_click = on_row and not event.state & (0x0001 | 0x0004)
+
+    def _on_select(self, event=None):
+        # Mirror the Treeview selection of the visible rows into the model;
+        # selected rows outside the viewport are kept unless a plain click
+        # started a new selection
+        chosen = {self._item_keys[iid] for iid in self.tree.selection() if iid in self._item_keys}
+        if self._plain_click:
+            self._plain_click = False
+            self.selected = chosen
+            return
+        visible = set(self._item_keys.values())
+        self.selected = (self.selected - visible) | chosen
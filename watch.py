@@ -0,0 +1,311 @@
+"""Watch mode: keep one combined .ics up to date with a folder of schedules.
+
+The folder is polled (stat only, no extra dependencies). A file is picked up
+once its size and mtime have stayed the same for one poll, or its mtime is
+older than the settle time, so uploads still being written are left alone.
+Changed files are parsed with at most `workers` processes; a burst of
+uploads queues up as one round, and a file that changes again meanwhile is
+simply picked up on the next poll.
+
+CombinedCalendar keeps the events of every file and the serialized VEVENT of
+every exported event, so one updated workbook only re-serializes its own
+events; the rest of the combined calendar is written from cached text.
+Events are deduplicated on (date, event_type, project_code) and the first
+file in path order owns an event, as in a merged import. SEQUENCE bookkeeping
+uses the same sidecar index as incremental export (see ics_sync.py); a second
+sidecar (<file>.files.json) lists the UIDs of every file, so a file that
+fails to parse after a restart keeps its VEVENTs from the previous calendar.
+"""
+import errno
+import json
+import os
+import time
+
+import ics_sync
+from atomicfile import atomic_write
+from extractor import collect_inputs
+from ics import DateFormatter, event_uid, serialize_event, write_vevents
+from instrument import log
+from merge import event_key, iter_parsed_files
+
+POLL_INTERVAL = 10.0
+FILES_SUFFIX = ".files.json"
+
+
+def load_file_uids(file_path):
+    try:
+        with open(file_path + FILES_SUFFIX, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class CombinedCalendar:
+    def __init__(self, file_path, delta_path=None):
+        self.file_path = file_path
+        self.delta_path = delta_path
+        self.index = ics_sync.load_index(file_path)  # UID -> [sequence, content hash, date]
+        self._events = {}  # file path -> {event key: event}, first occurrence per file
+        self._holders = {}  # event key -> paths of the files listing it
+        self._owner = {}  # event key -> path of the file whose event is exported
+        self._vevents = {}  # event key -> (UID, serialized VEVENT)
+        self._file_uids = load_file_uids(file_path)  # file path -> UIDs of its events
+        self._kept = {}  # file path -> [(UID, VEVENT)] from the previous calendar
+        self._unwritten = None  # delta of updates whose write failed
+        self._format_date = DateFormatter()
+
+    def __len__(self):
+        return len(self._vevents)
+
+    @property
+    def needs_write(self):
+        return self._unwritten is not None
+
+    def update(self, changes, full=False):
+        # changes: {file path: its events, or None if the file is gone}.
+        # Returns ics_sync.SyncStats for the events that changed hands or
+        # content. full=True also cancels indexed UIDs no file lists any more
+        # (files deleted while nothing was watching).
+        stats = ics_sync.SyncStats()
+        delta = []
+        affected = set()
+        dropped = []  # UIDs kept for files that are gone
+        for path, events in changes.items():
+            old = self._events.pop(path, {})
+            new = {}
+            if events is not None:
+                for event in events:
+                    new.setdefault(event_key(event), event)
+                self._events[path] = new
+                self._file_uids[path] = [event_uid(event) for event in new.values()]
+                self._kept.pop(path, None)
+            else:
+                self._file_uids.pop(path, None)
+                dropped.extend(uid for uid, _vevent in self._kept.pop(path, ()))
+            for key in old.keys() - new.keys():
+                holders = self._holders[key]
+                holders.discard(path)
+                if not holders:
+                    del self._holders[key]
+            for key in new.keys() - old.keys():
+                self._holders.setdefault(key, set()).add(path)
+            affected.update(old)
+            affected.update(new)
+        for key in affected:
+            holders = self._holders.get(key)
+            if holders:
+                owner = self._owner[key] = min(holders)
+                self._export(key, self._events[owner][key], stats, delta)
+            else:
+                self._owner.pop(key, None)
+                self._remove(key, stats, delta)
+        if dropped:
+            exported = self._exported_uids()
+            for uid in dropped:
+                if uid not in exported:
+                    self._cancel(uid, stats, delta)
+        if full:
+            exported = self._exported_uids()
+            for uid in [uid for uid in self.index if uid not in exported]:
+                self._cancel(uid, stats, delta)
+            self._file_uids = {path: uids for path, uids in self._file_uids.items() if path in self._events}
+        if stats.added or stats.changed or stats.removed or full or self.needs_write:
+            self._write(delta)
+        return stats
+
+    def keep(self, path):
+        # For a file that failed to parse before its events were loaded:
+        # keep its VEVENTs from the previous calendar until it parses again
+        if path in self._events or path in self._kept:
+            return
+        uids = self._file_uids.get(path)
+        if not uids:
+            return
+        found = ics_sync.read_vevents(self.file_path, uids)
+        self._kept[path] = [(uid, found[uid]) for uid in uids
+                            if uid in found and self.index.get(uid, [0, None])[1] is not None]
+
+    def _exported_uids(self):
+        exported = {uid for uid, _vevent in self._vevents.values()}
+        for kept in self._kept.values():
+            exported.update(uid for uid, _vevent in kept)
+        return exported
+
+    def _export(self, key, event, stats, delta):
+        ical_date = self._format_date(event)
+        if ical_date is None:
+            self._remove(key, stats, delta)  # Skip events with invalid dates
+            return
+        uid = event_uid(event)
+        extra = [f"UID:{uid}"]
+        vevent = serialize_event(event, ical_date, extra)
+        digest = ics_sync.content_hash(vevent)
+        old = self.index.get(uid)
+        sequence = ics_sync.next_sequence(old, digest, stats)
+        if sequence:
+            vevent = serialize_event(event, ical_date, extra + [f"SEQUENCE:{sequence}"])
+        if old is None or old[1] != digest:
+            delta.append(vevent)
+        self.index[uid] = [sequence, digest, ical_date]
+        self._vevents[key] = (uid, vevent)
+
+    def _remove(self, key, stats, delta):
+        entry = self._vevents.pop(key, None)
+        if entry is not None:
+            self._cancel(entry[0], stats, delta)
+
+    def _cancel(self, uid, stats, delta):
+        sequence, digest, ical_date = self.index[uid]
+        if digest is None:
+            return  # already cancelled earlier
+        stats.removed += 1
+        self.index[uid] = [sequence + 1, None, ical_date]
+        delta.append(ics_sync.cancel_stub(uid, sequence + 1, ical_date))
+
+    def iter_vevents(self):
+        # Files in path order, each file's events in file order
+        owner = self._owner
+        vevents = self._vevents
+        live = {uid for uid, _vevent in vevents.values()} if self._kept else ()
+        for path in sorted(self._events.keys() | self._kept.keys()):
+            if path in self._kept:
+                for uid, vevent in self._kept[path]:
+                    if uid not in live:
+                        yield vevent
+                continue
+            for key in self._events[path]:
+                if owner.get(key) == path and key in vevents:
+                    yield vevents[key][1]
+
+    def _write(self, delta):
+        # The index and events in memory are already updated. If writing
+        # fails, the files on disk are behind: the next update writes them
+        # again, with this delta included, even if nothing else changed.
+        if self._unwritten:
+            delta = self._unwritten + delta
+        try:
+            write_vevents(self.iter_vevents(), self.file_path)
+            if self.delta_path:
+                write_vevents(delta, self.delta_path)
+            ics_sync.save_index(self.file_path, self.index)
+            with atomic_write(self.file_path + FILES_SUFFIX) as f:
+                f.write(json.dumps(self._file_uids, separators=(",", ":")))
+        except BaseException:
+            self._unwritten = delta
+            raise
+        self._unwritten = None
+
+
+class FolderWatcher:
+    # Polls the inputs (files and directories, as for the batch CLI) and
+    # feeds settled changes into a CombinedCalendar
+    def __init__(self, inputs, calendar, recursive=False, workers=None, pages=None, prescan=True, cache=None,
+                 schema=None, settle=POLL_INTERVAL):
+        self.inputs = inputs
+        self.calendar = calendar
+        self.recursive = recursive
+        self.workers = workers
+        self.pages = pages
+        self.prescan = prescan
+        self.cache = cache
+        self.schema = schema
+        self.settle = settle
+        self.rounds = 0
+        self._swept = False
+        self._seen = {}  # path -> (size, mtime_ns) at the last poll
+        self._done = {}  # path -> (size, mtime_ns) when last processed
+        self._input_files = set()  # inputs named directly that were files
+        self._failed = set()  # paths whose last parse failed
+
+    def check_inputs(self):
+        # Raises OSError if an input cannot be reached. An unmounted share or
+        # a renamed folder must not look like a folder whose files were all
+        # deleted; a file input is only gone if its folder is still there.
+        for path in self.inputs:
+            if os.path.isfile(path):
+                self._input_files.add(path)
+            elif not os.path.isdir(path):
+                if path not in self._input_files or not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+                    raise FileNotFoundError(errno.ENOENT, "input not reachable", path)
+
+    def scan(self):
+        self.check_inputs()
+        current = {}
+        for path in collect_inputs(self.inputs, self.recursive, strict=True):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed between listing and stat
+            current[path] = (st.st_size, st.st_mtime_ns)
+        return current
+
+    def poll(self):
+        # -> (paths that changed and have settled, paths that are gone).
+        # Nothing to do while an input cannot be listed.
+        try:
+            current = self.scan()
+        except OSError as e:
+            log.warning("cannot read the inputs, skipping this round: %s", e)
+            return [], []
+        settled_before = time.time_ns() - int(self.settle * 1e9)
+        ready = [path for path, signature in current.items()
+                 if self._done.get(path) != signature
+                 and (self._seen.get(path) == signature or signature[1] <= settled_before)]
+        gone = [path for path in self._done if path not in current]
+        self._seen = current
+        return ready, gone
+
+    def process(self, ready, gone):
+        # Returns (SyncStats, failures) for one round. Bookkeeping is only
+        # updated once every file is parsed, so a round that breaks off is
+        # simply done again.
+        changes = {path: None for path in gone}
+        processed = {}
+        failures = []
+        for path, events, error in iter_parsed_files(ready, self.workers, self.pages, self.prescan, self.cache,
+                                                     self.schema):
+            # Failed files are not retried until they change again; their
+            # previous events stay in the calendar (a half-copied upload
+            # should not wipe a schedule)
+            processed[path] = self._seen[path]
+            if error is not None:
+                failures.append((path, error))
+                log.warning("%s: failed: %s (keeping its previous events)", path, error)
+                continue
+            changes[path] = events
+        for path in gone:
+            del self._done[path]
+            self._failed.discard(path)
+        self._done.update(processed)
+        for path, _error in failures:
+            self._failed.add(path)
+            self.calendar.keep(path)
+        self._failed.difference_update(changes)
+        # The first complete round also cancels UIDs of files deleted while
+        # nothing was watching. Not while a file is still settling or fails
+        # to parse: its events are not loaded yet and would look deleted.
+        full = not self._swept and not self._failed and self._done.keys() >= self._seen.keys()
+        stats = self.calendar.update(changes, full=full)
+        self._swept = self._swept or full
+        self.rounds += 1
+        return stats, failures
+
+    def run(self, interval=POLL_INTERVAL, on_round=None, stop=None):
+        # Polls until stop (a threading.Event) is set, or forever.
+        # on_round(ready, gone, stats, failures) is called after every round
+        # that had something to do. A round that fails (the share went away
+        # while writing) is logged and retried on the next poll.
+        while stop is None or not stop.is_set():
+            try:
+                ready, gone = self.poll()
+                if ready or gone or self.calendar.needs_write:
+                    log.info("processing %d changed, %d removed files", len(ready), len(gone))
+                    stats, failures = self.process(ready, gone)
+                    if on_round:
+                        on_round(ready, gone, stats, failures)
+            except Exception:
+                log.exception("watch round failed, retrying on the next poll")
+            if stop is None:
+                time.sleep(interval)
+            else:
+                stop.wait(interval)